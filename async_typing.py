@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from keystroke_plan import compile_plan, plan_events
+from render import render_to_wav
+from scheduler import lateness_summary
+from simulate_typing import plan_event_runner
+from sound_bank import VariantSelector
+
+
+async def sleep_until(deadline):
+    """Awaits until `time.perf_counter()` reaches `deadline`, without blocking the event loop."""
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class TypingSession:
+    """
+    One typing job run as a coroutine.
+
+    Key downs and key ups run at absolute deadlines on the same timeline as
+    `type_plan`, but waits are awaited rather than slept, so any number of
+    sessions can share one event loop and one Mixer. Cancel the task running
+    `run()` to stop a session; `pause()` and `resume()` hold it mid-text,
+    shifting the rest of the deadlines by the time spent paused.
+    """
+
+    def __init__(self, text, bank, mixer, backend, model=None, seed=None):
+        self.plan = compile_plan(text, seed=seed, model=model)
+        self.mixer = mixer
+        self.backend = backend
+        self.selector = VariantSelector(bank, seed=seed)
+        self.position = 0 # Key down and key up events run so far
+        self.lateness = []
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._paused_at = None
+        self._start_time = None
+
+    @property
+    def paused(self):
+        return not self._resumed.is_set()
+
+    def pause(self):
+        """
+        Stops typing once no key is held down, so nothing is left pressed,
+        until `resume()` is called.
+        """
+        if not self.paused:
+            self._paused_at = time.perf_counter()
+            self._resumed.clear()
+
+    def resume(self):
+        """Continues typing where `pause()` stopped it."""
+        if self.paused:
+            if self._start_time is not None:
+                self._start_time += time.perf_counter() - self._paused_at
+            self._paused_at = None
+            self._resumed.set()
+
+    async def run(self):
+        """
+        Types the whole text and returns the lateness summary, which counts
+        events, not keys. If the task is cancelled, every key still down is
+        released before the cancellation goes on.
+        """
+        events = plan_events(self.plan)
+        key_event = plan_event_runner(self.plan, events, self.mixer, self.backend, self.selector)
+        indices = events['index'].tolist()
+        downs = events['down'].tolist()
+        offsets = events['offset'].tolist()
+        up_events = {index: i for i, (index, down) in enumerate(zip(indices, downs)) if not down}
+        held = [] # Keystrokes down and not yet released, in the order they went down
+
+        self._start_time = time.perf_counter()
+        try:
+            while self.position < len(offsets):
+                i = self.position
+                if not held:
+                    await self._resumed.wait()
+                deadline = self._start_time + offsets[i]
+                await sleep_until(deadline)
+                if self.paused and not held:
+                    continue # Paused while waiting; recompute the deadline after resuming
+
+                self.lateness.append(time.perf_counter() - deadline)
+                # Handing a sound to the mixer is a queue append, so it never blocks the loop
+                key_event(i)
+                if downs[i]:
+                    held.append(indices[i])
+                else:
+                    held.remove(indices[i])
+                self.position += 1
+        finally:
+            # Only left non-empty by a cancellation mid-text
+            for index in reversed(held):
+                key_event(up_events[index])
+        return lateness_summary(self.lateness)
+
+
+async def type_text(text, bank, mixer, backend, model=None, seed=None):
+    """Types `text` in one session and returns the lateness summary."""
+    return await TypingSession(text, bank, mixer, backend, model=model, seed=seed).run()
+
+
+async def render_text(text, output_path, bank, model=None, seed=None):
+    """
+    Renders `text` to a WAV file on a worker thread, so renders can run
+    next to live sessions without stalling the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, lambda: render_to_wav(text, output_path, bank, seed=seed, model=model))
@@ -0,0 +1,137 @@
+import random
+from collections import OrderedDict
+
+import numpy as np
+
+from keymap import KEY_POSITIONS, KEYBOARD_WIDTH
+from sound_bank import RELEASE_SUFFIX
+
+# --- Augmentation Configuration ---
+POOL_SIZE = 8 # Augmented takes precomputed per key
+CACHE_BYTES = 64 * 1024 * 1024 # Memory ceiling for all cached pools
+GAIN_DB = 1.5 # Max loudness change, either way
+PITCH_CENTS = 40 # Max pitch shift, either way; the take is shortened or lengthened to match
+TILT_DB_PER_OCTAVE = 0.75 # Max EQ tilt around TILT_CENTER, either way
+TILT_CENTER = 1000.0 # Hz, left unchanged by the tilt
+TILT_MAX_DB = 6.0 # Limit on the tilt's boost or cut at the band edges
+PAN_WIDTH = 0.6 # How far the keyboard's outer keys are panned, 0 (mono) to 1 (hard)
+
+
+def key_pan(key):
+    """Stereo position of `key` from -1 (left) to 1 (right), by where it sits on the keyboard."""
+    if key.endswith(RELEASE_SUFFIX):
+        key = key[:-len(RELEASE_SUFFIX)]
+    position = KEY_POSITIONS.get(key, KEYBOARD_WIDTH / 2)
+    return PAN_WIDTH * (2.0 * position / KEYBOARD_WIDTH - 1.0)
+
+
+def augment_takes(takes, rate, count, pan=0.0, rng=None):
+    """
+    Makes `count` varied copies of a key's takes, all in one batch.
+
+    Each copy is a random take with its own gain, pitch shift and EQ tilt,
+    and stereo takes are panned to `pan`. The takes are stacked into one
+    (count, frames, channels) array so every step is a single NumPy
+    operation over the whole batch. Returns a list of float32 arrays.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    channels = takes[0].shape[1]
+    chosen = rng.integers(len(takes), size=count)
+    lengths = np.array([len(takes[i]) for i in chosen])
+    ratios = 2.0 ** (rng.uniform(-PITCH_CENTS, PITCH_CENTS, count) / 1200.0)
+    gains = 10.0 ** (rng.uniform(-GAIN_DB, GAIN_DB, count) / 20.0)
+    tilts = rng.uniform(-TILT_DB_PER_OCTAVE, TILT_DB_PER_OCTAVE, count)
+
+    # Pitch: read each take at its own speed with linear interpolation,
+    # zero-padded to the longest result
+    out_lengths = np.maximum(1, (lengths / ratios).astype(int))
+    frames = int(out_lengths.max())
+    batch = np.zeros((count, int(lengths.max()) + 1, channels), dtype=np.float32)
+    for row, take in enumerate(chosen):
+        batch[row, :lengths[row]] = takes[take]
+    positions = np.arange(frames)[None, :] * ratios[:, None]
+    positions = np.minimum(positions, lengths[:, None])
+    index = positions.astype(int)
+    frac = (positions - index).astype(np.float32)[:, :, None]
+    rows = np.arange(count)[:, None]
+    stretched = batch[rows, index] * (1.0 - frac) + batch[rows, np.minimum(index + 1, lengths[:, None])] * frac
+    stretched[np.arange(frames)[None, :] >= out_lengths[:, None]] = 0.0
+
+    # EQ tilt and gain together, as one gain curve per copy over the
+    # spectrum; the FFT is padded to a power of two to keep it fast
+    fft_size = 1 << (frames - 1).bit_length()
+    spectrum = np.fft.rfft(stretched, n=fft_size, axis=1)
+    freqs = np.fft.rfftfreq(fft_size, 1.0 / rate)
+    octaves = np.log2(np.maximum(freqs, 20.0) / TILT_CENTER)
+    tilt_db = np.clip(tilts[:, None] * octaves[None, :], -TILT_MAX_DB, TILT_MAX_DB)
+    curves = gains[:, None] * 10.0 ** (tilt_db / 20.0)
+    spectrum *= curves[:, :, None]
+    augmented = np.fft.irfft(spectrum, n=fft_size, axis=1)[:, :frames].astype(np.float32)
+
+    # Constant-power pan, scaled so a centred key keeps its level
+    if channels == 2:
+        angle = (pan + 1.0) * np.pi / 4.0
+        augmented *= np.sqrt(2.0) * np.array([np.cos(angle), np.sin(angle)], dtype=np.float32)
+
+    return [augmented[row, :out_lengths[row]] for row in range(count)]
+
+
+class AugmentedSelector:
+    """
+    Picks a varied take of a key on each press, as a drop-in for VariantSelector.
+
+    The first press of a key builds a pool of POOL_SIZE augmented takes in
+    one batch; later presses cycle through the pool without repeating back
+    to back. Pools are kept in an LRU cache bounded by `max_bytes`, so a
+    large bank can't grow without limit; an evicted key is rebuilt on its
+    next press. Call `warm()` with the keys of a text before typing it so no
+    pool is built mid-sentence.
+    """
+
+    def __init__(self, bank, seed=None, pool_size=POOL_SIZE, max_bytes=CACHE_BYTES):
+        self._variants = bank.variants
+        self._rate = bank.rate
+        self._rng = np.random.default_rng(seed)
+        self._picker = random.Random(seed)
+        self.pool_size = pool_size
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._pools = OrderedDict()
+        self._last = {}
+
+    def _pool(self, key):
+        """Returns the cached pool for `key`, building it (and evicting old ones) if needed."""
+        pool = self._pools.get(key)
+        if pool is not None:
+            self._pools.move_to_end(key)
+            return pool
+
+        pool = augment_takes(self._variants[key], self._rate, self.pool_size,
+                             key_pan(key), self._rng)
+        self._pools[key] = pool
+        self.nbytes += sum(take.nbytes for take in pool)
+        # Never evict the pool just built, even if it alone is over the ceiling
+        while self.nbytes > self.max_bytes and len(self._pools) > 1:
+            _, evicted = self._pools.popitem(last=False)
+            self.nbytes -= sum(take.nbytes for take in evicted)
+        return pool
+
+    def warm(self, keys):
+        """Builds the pools for `keys` ahead of time."""
+        for key in keys:
+            if key in self._variants:
+                self._pool(key)
+
+    def next(self, key):
+        """Returns the samples of a varied take of `key`, or None if there is no sound for it."""
+        if key not in self._variants:
+            return None
+        pool = self._pool(key)
+        # Any take but the one that just played
+        if len(pool) == 1:
+            return pool[0]
+        choice = self._picker.randrange(len(pool) - 1)
+        if choice >= self._last.get(key, len(pool)):
+            choice += 1
+        self._last[key] = choice
+        return pool[choice]
@@ -0,0 +1,236 @@
+import time
+
+from keymap import CHAR_KEYS, CHARS_BY_KEY, KEY_CODES, KEY_NAMES_BY_CODE, MODIFIER_FLAGS, MODIFIERS
+from telemetry import ENQUEUED, INJECTED
+
+
+class InjectionBackend:
+    """
+    Sends key events somewhere. Keys are named as in `keymap.KEY_CODES`:
+    a character for printable keys, or a name such as 'return' or 'shift'.
+    """
+
+    def press(self, key):
+        """Sends a key down event."""
+        raise NotImplementedError
+
+    def release(self, key):
+        """Sends a key up event."""
+        raise NotImplementedError
+
+    def type_chord(self, key, modifiers=()):
+        """Presses `modifiers`, taps `key`, then releases the modifiers in reverse order."""
+        for modifier in modifiers:
+            self.press(modifier)
+        self.press(key)
+        self.release(key)
+        for modifier in reversed(modifiers):
+            self.release(modifier)
+
+    def type_key(self, key_code, flags=0):
+        """Taps the key with virtual `key_code` holding the modifiers in `flags`, as in a keystroke plan."""
+        modifiers = tuple(modifier for modifier in MODIFIERS if flags & MODIFIER_FLAGS[modifier])
+        self.type_chord(KEY_NAMES_BY_CODE[key_code], modifiers)
+
+    def key_down(self, key_code, flags=0):
+        """Presses the modifiers in `flags`, then the key with virtual `key_code`, and returns."""
+        for modifier in MODIFIERS:
+            if flags & MODIFIER_FLAGS[modifier]:
+                self.press(modifier)
+        self.press(KEY_NAMES_BY_CODE[key_code])
+
+    def key_up(self, key_code, flags=0):
+        """Releases the key pressed by `key_down`, then its modifiers in reverse order."""
+        self.release(KEY_NAMES_BY_CODE[key_code])
+        for modifier in reversed(MODIFIERS):
+            if flags & MODIFIER_FLAGS[modifier]:
+                self.release(modifier)
+
+    def type_char(self, char):
+        """Types one character, holding Shift for uppercase letters."""
+        if 'A' <= char <= 'Z':
+            self.type_chord(char.lower(), ('shift',))
+        else:
+            self.type_chord(CHAR_KEYS.get(char, char))
+
+    def close(self):
+        """Releases anything the backend holds on to."""
+
+
+class QuartzBackend(InjectionBackend):
+    """
+    Posts events through macOS Quartz. The event source is created once and
+    reused for every event, and held modifiers are applied as event flags.
+    """
+
+    def __init__(self):
+        # Imported here so the other backends work on machines without Quartz
+        import Quartz
+
+        self._quartz = Quartz
+        self._source = Quartz.CGEventSourceCreate(Quartz.kCGEventSourceStateHIDSystemState)
+        self._modifier_flags = {
+            'shift': Quartz.kCGEventFlagMaskShift,
+            'control': Quartz.kCGEventFlagMaskControl,
+            'option': Quartz.kCGEventFlagMaskAlternate,
+            'command': Quartz.kCGEventFlagMaskCommand,
+        }
+        self._flags = 0
+        # Plan flag bits -> Quartz event flags
+        self._plan_flags = [0] * 16
+        for bits in range(16):
+            for modifier, bit in MODIFIER_FLAGS.items():
+                if bits & bit:
+                    self._plan_flags[bits] |= self._modifier_flags[modifier]
+
+    def post_key(self, key_code, key_down, flags=0):
+        """Posts a single key event for a virtual key code with the given modifier flags."""
+        event = self._quartz.CGEventCreateKeyboardEvent(self._source, key_code, key_down)
+        self._quartz.CGEventSetFlags(event, flags)
+        self._quartz.CGEventPost(self._quartz.kCGHIDEventTap, event)
+
+    def _key_code(self, key):
+        key_code = KEY_CODES.get(key)
+        if key_code is None:
+            raise ValueError(f"Key '{key}' not found in key_code_map")
+        return key_code
+
+    def press(self, key):
+        if key in self._modifier_flags:
+            self._flags |= self._modifier_flags[key]
+        self.post_key(self._key_code(key), True, self._flags)
+
+    def release(self, key):
+        if key in self._modifier_flags:
+            self._flags &= ~self._modifier_flags[key]
+        self.post_key(self._key_code(key), False, self._flags)
+
+    def type_key(self, key_code, flags=0):
+        # Modifiers ride along as flags on the key down, with no separate modifier events
+        self.post_key(key_code, True, self._plan_flags[flags])
+        self.post_key(key_code, False, self._flags)
+
+    def key_down(self, key_code, flags=0):
+        self.post_key(key_code, True, self._plan_flags[flags])
+
+    def key_up(self, key_code, flags=0):
+        self.post_key(key_code, False, self._flags)
+
+
+class PynputBackend(InjectionBackend):
+    """Injects keys with a pynput keyboard Controller."""
+
+    def __init__(self):
+        from pynput.keyboard import Controller, Key
+
+        self._controller = Controller()
+        self._special_keys = {
+            ' ': Key.space,
+            'return': Key.enter,
+            'tab': Key.tab,
+            'backspace': Key.backspace,
+            'escape': Key.esc,
+            'command': Key.cmd,
+            'shift': Key.shift,
+            'option': Key.alt,
+            'control': Key.ctrl,
+        }
+
+    def press(self, key):
+        self._controller.press(self._special_keys.get(key, key))
+
+    def release(self, key):
+        self._controller.release(self._special_keys.get(key, key))
+
+    def type_key(self, key_code, flags=0):
+        char = CHARS_BY_KEY.get((key_code, flags))
+        if char is None:
+            super().type_key(key_code, flags)
+        else:
+            self.type_char(char)
+
+    def type_char(self, char):
+        # The controller handles uppercase, punctuation, etc., automatically.
+        self._controller.type(char)
+
+
+class RecordingBackend(InjectionBackend):
+    """
+    Injects nothing and logs every event as (perf_counter_ns, 'press' or
+    'release', key), so the pipeline can run and be measured headless.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def press(self, key):
+        self.events.append((time.perf_counter_ns(), 'press', key))
+
+    def release(self, key):
+        self.events.append((time.perf_counter_ns(), 'release', key))
+
+
+class NullBackend(InjectionBackend):
+    """Discards every event. Useful to measure everything except injection."""
+
+    def press(self, key):
+        pass
+
+    def release(self, key):
+        pass
+
+
+# One Quartz event source for every key posted through quartz_backend(), created on first use
+_quartz_backend = None
+
+
+def quartz_backend():
+    """The shared QuartzBackend, created the first time it is asked for."""
+    global _quartz_backend
+    if _quartz_backend is None:
+        _quartz_backend = QuartzBackend()
+    return _quartz_backend
+
+
+def key_event_runner(plan, events, backend, play=None, telemetry=None):
+    """
+    Returns a function that runs event `i` of a plan's `events` (see
+    `keystroke_plan.plan_events`): calls `play(i, key, down)` for the sound
+    of keystroke `key`, if given, and posts the key down or up to `backend`.
+    """
+    indices = events['index'].tolist()
+    downs = events['down'].tolist()
+    key_codes = plan['key_code'].tolist()
+    flags = plan['flags'].tolist()
+
+    def key_event(i):
+        key = indices[i]
+        if play is not None:
+            play(i, key, downs[i])
+        if telemetry is not None:
+            telemetry.mark(i, ENQUEUED, time.perf_counter())
+
+        if downs[i]:
+            backend.key_down(key_codes[key], flags[key])
+        else:
+            backend.key_up(key_codes[key], flags[key])
+        if telemetry is not None:
+            telemetry.mark(i, INJECTED, time.perf_counter())
+
+    return key_event
+
+
+BACKENDS = {
+    'quartz': QuartzBackend,
+    'pynput': PynputBackend,
+    'recording': RecordingBackend,
+    'null': NullBackend,
+}
+
+
+def get_backend(name):
+    """Creates an injection backend by name: 'quartz', 'pynput', 'recording' or 'null'."""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown injection backend '{name}', expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from backends import NullBackend
+from key_imposter import COMMAND_BUDGET_SECONDS, HELP_BUDGET_SECONDS
+from capture import RingBuffer
+from keystroke_plan import compile_plan
+from mixer import Mixer, NullAudioOutput
+from onset import trim_keystroke
+from simulate_typing import type_plan
+from sound_bank import VariantSelector, load_bank
+from telemetry import Telemetry, format_telemetry
+
+# --- Benchmark Configuration ---
+BENCH_KEYS = 1000     # Keystrokes per benchmark session
+PACED_RATE = 200      # Chars/sec for the paced session
+RESULTS_FILE = "bench_results.json"
+BENCH_TEXT = "The quick brown fox jumps over the lazy dog, 1234567890 times! "
+
+# Synthetic bank used when no sound directory is given
+SYNTHETIC_KEYS = "abcdefghijklmnopqrstuvwxyz0123456789 "
+SYNTHETIC_TAKES = 3
+SYNTHETIC_SECONDS = 0.2
+RATE = 44100
+
+# Commands whose cold start is checked against the CLI budget
+CLI_COMMANDS = ("record", "record-session", "keylog", "simulate", "render", "stream", "daemon", "recognize")
+CLI_RUNS = 3 # Best of this many runs, to leave out disk cache misses
+
+
+class ThreadProbeBackend(NullBackend):
+    """Null injection that records the highest thread count seen while typing."""
+
+    def __init__(self):
+        self.peak_threads = threading.active_count()
+
+    def key_down(self, key_code, flags=0):
+        self.peak_threads = max(self.peak_threads, threading.active_count())
+
+
+def rss_bytes():
+    """Current resident memory of this process (peak, where current is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def write_synthetic_bank(directory):
+    """Writes decaying-noise keystroke takes, so benchmarks run without a recorded bank."""
+    rng = np.random.default_rng(0)
+    length = int(SYNTHETIC_SECONDS * RATE)
+    envelope = np.exp(-np.arange(length) / (0.02 * RATE))
+    for key in SYNTHETIC_KEYS:
+        for take in range(SYNTHETIC_TAKES):
+            samples = (rng.standard_normal(length) * envelope * 8000).astype(np.int16)
+            name = f"{key}.wav" if take == 0 else f"{key}.{take}.wav"
+            with wave.open(os.path.join(directory, name), 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(RATE)
+                wf.writeframes(samples.tobytes())
+
+
+def bench_text(keys):
+    """A benchmark text exactly `keys` characters long."""
+    return (BENCH_TEXT * (keys // len(BENCH_TEXT) + 1))[:keys]
+
+
+def bench_startup(sounds_dir):
+    """Cold-start cost in a fresh interpreter: imports, then loading the bank."""
+    script = (
+        "import time; t0 = time.perf_counter()\n"
+        "import simulate_typing\n"
+        "from sound_bank import load_bank\n"
+        "t1 = time.perf_counter()\n"
+        f"load_bank({sounds_dir!r})\n"
+        "t2 = time.perf_counter()\n"
+        "print(t1 - t0, t2 - t1)\n"
+    )
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    total = time.perf_counter() - start
+    import_s, bank_load_s = (float(value) for value in output.stdout.split()[-2:])
+    return {"process_s": total, "import_s": import_s, "bank_load_s": bank_load_s}
+
+
+def bench_cli_startup():
+    """
+    Wall time of `key_imposter --help` and of each CLI_COMMANDS command's
+    --help from a fresh interpreter, best of CLI_RUNS, against the budget.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    probes = [("--help",)] + [(command, "--help") for command in CLI_COMMANDS]
+    results = {}
+    for probe in probes:
+        times = []
+        for _ in range(CLI_RUNS):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "key_imposter.py", *probe], capture_output=True,
+                           check=True, cwd=cwd)
+            times.append(time.perf_counter() - start)
+        budget = HELP_BUDGET_SECONDS if len(probe) == 1 else COMMAND_BUDGET_SECONDS
+        results[" ".join(probe)] = {"seconds": min(times), "budget_s": budget,
+                                    "within_budget": min(times) <= budget}
+    return results
+
+
+def bench_memory(sounds_dir):
+    """Resident memory added by loading the bank, against the size of its samples."""
+    before = rss_bytes()
+    bank = load_bank(sounds_dir)
+    after = rss_bytes()
+    bank_bytes = sum(samples.nbytes for takes in bank.variants.values() for samples in takes)
+    return bank, {"bank_sample_bytes": bank_bytes, "rss_before_bytes": before,
+                  "rss_after_bytes": after, "rss_growth_bytes": after - before}
+
+
+def run_session(bank, keys, interval, telemetry=None, hold=None):
+    """
+    Types `keys` keystrokes through the null backend and null audio device,
+    timing every stage of every event on `telemetry` if one is given. A
+    `hold` replaces every key's hold time; with 0 each key goes up as soon
+    as it went down, so no time is spent waiting on the last key up.
+    """
+    plan = compile_plan(bench_text(keys), interval=interval)
+    if hold is not None:
+        plan['hold'] = hold
+    mixer = Mixer(bank.channels, bank.sample_width, telemetry=telemetry)
+    backend = ThreadProbeBackend()
+    selector = VariantSelector(bank, seed=0)
+    # One untimed keystroke first, so one-time costs such as NumPy's lazy
+    # imports aren't counted against the session
+    warm_up = compile_plan("a", interval=0.0)
+    warm_up['hold'] = 0.0
+    type_plan(warm_up, Mixer(bank.channels, bank.sample_width), NullBackend(), selector)
+    with NullAudioOutput(mixer, bank.rate):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        lateness = type_plan(plan, mixer, backend, selector, telemetry)
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return {
+        "keys": keys,
+        "wall_s": wall,
+        "chars_per_sec": keys / wall,
+        "cpu_s_per_1000_keys": cpu / keys * 1000,
+        "peak_threads": backend.peak_threads,
+        "lateness": lateness,
+    }
+
+
+def bench_extraction(bank, keys):
+    """
+    The recorder's extraction path: keystrokes mixed into a ring buffer as
+    a capture would fill it, then cut back out one window at a time.
+    """
+    rng = np.random.default_rng(0)
+    selector = VariantSelector(bank, seed=0)
+    text = bench_text(keys)
+    spacing = int(0.15 * bank.rate)
+    window = int(0.35 * bank.rate)
+    total = spacing * keys + window
+
+    capture = (rng.standard_normal((total, bank.channels)) * 30).astype(np.float32)
+    for i, char in enumerate(text):
+        samples = selector.next(char.lower())
+        if samples is not None:
+            start = i * spacing
+            capture[start:start + len(samples)] += samples * 32767
+    buffer = RingBuffer(total, bank.channels)
+    buffer.write(np.clip(capture, -32768, 32767).astype(np.int16))
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    found = 0
+    for i in range(keys):
+        start = max(0, i * spacing - int(0.05 * bank.rate))
+        if trim_keystroke(buffer.read(start, start + window), bank.rate) is not None:
+            found += 1
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return {"keys": keys, "found": found, "keys_per_sec": keys / wall,
+            "cpu_s_per_1000_keys": cpu / keys * 1000}
+
+
+def run_benchmarks(sounds_dir, keys=BENCH_KEYS, rate=PACED_RATE, telemetry=None):
+    """
+    Runs every benchmark and returns the results as a dictionary. The paced
+    session is recorded on `telemetry`, if given, and its summary included.
+    """
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sounds_dir": sounds_dir,
+    }
+    results["startup"] = bench_startup(sounds_dir)
+    results["cli_startup"] = bench_cli_startup()
+    bank, results["memory"] = bench_memory(sounds_dir)
+    # Without holds, so the time measured is the pipeline's and not the last key's hold
+    results["max_throughput"] = run_session(bank, keys, interval=0.0, hold=0.0)
+    results["paced"] = run_session(bank, keys, interval=1.0 / rate, telemetry=telemetry)
+    if telemetry is not None:
+        results["telemetry"] = telemetry.summary()
+    results["extraction"] = bench_extraction(bank, keys)
+    return results
+
+
+def print_results(results):
+    startup, memory = results["startup"], results["memory"]
+    fastest, paced, extraction = results["max_throughput"], results["paced"], results["extraction"]
+    print("--- Benchmark Results ---")
+    print(f"Startup: {startup['process_s']:.3f}s process, {startup['import_s']:.3f}s imports, "
+          f"{startup['bank_load_s']:.3f}s bank load")
+    for probe, timing in results["cli_startup"].items():
+        verdict = "ok" if timing["within_budget"] else "OVER BUDGET"
+        print(f"CLI 'key_imposter {probe}': {timing['seconds']:.3f}s "
+              f"(budget {timing['budget_s']:.2f}s, {verdict})")
+    print(f"Memory: bank samples {memory['bank_sample_bytes'] / 1e6:.1f} MB, "
+          f"resident growth {memory['rss_growth_bytes'] / 1e6:.1f} MB")
+    print(f"Max sustainable rate: {fastest['chars_per_sec']:.0f} chars/sec")
+    print(f"Paced at {paced['chars_per_sec']:.0f} chars/sec: {paced['cpu_s_per_1000_keys']:.3f}s CPU "
+          f"per 1000 keys, peak {paced['peak_threads']} threads, "
+          f"p99 lateness {paced['lateness'].get('p99_ms', 0):.3f} ms")
+    print(f"Extraction: {extraction['keys_per_sec']:.0f} keys/sec, "
+          f"{extraction['cpu_s_per_1000_keys']:.3f}s CPU per 1000 keys "
+          f"({extraction['found']}/{extraction['keys']} onsets found)")
+    if "telemetry" in results:
+        print("Paced session stages:")
+        print(format_telemetry(results["telemetry"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the typing and recording pipelines.")
+    parser.add_argument("--sounds-dir", default=None,
+                        help="Sound bank directory or packed bank file (default: a synthetic bank)")
+    parser.add_argument("--keys", type=int, default=BENCH_KEYS, help="Keystrokes per session")
+    parser.add_argument("--rate", type=float, default=PACED_RATE, help="Chars/sec of the paced session")
+    parser.add_argument("-o", "--output", default=RESULTS_FILE, help="Where to write the JSON results")
+    parser.add_argument("--telemetry", metavar="PATH", default=None,
+                        help="Time every stage of the paced session and save them to PATH (.json or .csv)")
+    args = parser.parse_args()
+
+    telemetry = Telemetry() if args.telemetry else None
+    if args.sounds_dir:
+        results = run_benchmarks(args.sounds_dir, args.keys, args.rate, telemetry)
+    else:
+        with tempfile.TemporaryDirectory() as sounds_dir:
+            write_synthetic_bank(sounds_dir)
+            results = run_benchmarks(sounds_dir, args.keys, args.rate, telemetry)
+            results["sounds_dir"] = None
+
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+    if telemetry is not None:
+        telemetry.save(args.telemetry)
+        print(f"Telemetry saved to {args.telemetry}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import numpy as np
+
+# --- Capture Configuration ---
+BUFFER_SECONDS = 10 # Audio history kept in the ring buffer
+
+
+class RingBuffer:
+    """
+    Fixed-size circular buffer of audio frames addressed by absolute frame
+    number, so a reader can ask for any recent window of the input.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.int16):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._written = 0
+        self._lock = threading.Lock()
+
+    @property
+    def frames_written(self):
+        """Total number of frames written since the buffer was created."""
+        return self._written
+
+    def write(self, frames):
+        """Appends frames of shape (n, channels), overwriting the oldest ones."""
+        # A block longer than the buffer only leaves its tail, but every
+        # frame of it still counts toward the absolute position
+        skipped = max(0, len(frames) - self.capacity)
+        frames = frames[skipped:]
+        with self._lock:
+            start = (self._written + skipped) % self.capacity
+            first = min(len(frames), self.capacity - start)
+            self._data[start:start + first] = frames[:first]
+            self._data[:len(frames) - first] = frames[first:]
+            self._written += skipped + len(frames)
+
+    def read(self, start, end):
+        """
+        Returns a copy of absolute frames [start, end). Raises ValueError if
+        part of the window has not been written yet or was already overwritten.
+        """
+        with self._lock:
+            if end > self._written or start < self._written - self.capacity or start > end:
+                raise ValueError(f"Frames [{start}, {end}) are not in the buffer "
+                                 f"(have [{max(0, self._written - self.capacity)}, {self._written}))")
+            indices = np.arange(start, end) % self.capacity
+            return self._data[indices]
+
+
+class ContinuousCapture:
+    """
+    One callback-mode PyAudio input stream that records into a RingBuffer
+    for as long as it is open. The audio thread never waits on anything
+    else the program is doing, such as terminal reads.
+    """
+
+    def __init__(self, rate, channels=1, chunk=1024, seconds=BUFFER_SECONDS, audio=None):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.buffer = RingBuffer(int(rate * seconds), channels)
+        self._audio = audio
+        self._owns_audio = audio is None
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.buffer.write(np.frombuffer(in_data, dtype=np.int16).reshape(-1, self.channels))
+        return (None, self._continue)
+
+    def start(self):
+        """Opens the input device and starts capturing."""
+        # Imported here so the buffer can be used without an audio device
+        import pyaudio
+
+        self._continue = pyaudio.paContinue
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16,
+                                        channels=self.channels,
+                                        rate=self.rate,
+                                        input=True,
+                                        frames_per_buffer=self.chunk,
+                                        stream_callback=self._callback)
+        self._stream.start_stream()
+
+    def current_frame(self):
+        """Absolute number of the next frame to be captured."""
+        return self.buffer.frames_written
+
+    def window(self, start, end, poll_interval=0.01):
+        """Waits until frames [start, end) have been captured and returns them."""
+        while self.buffer.frames_written < end:
+            time.sleep(poll_interval)
+        return self.buffer.read(start, end)
+
+    def close(self):
+        """Stops capturing and releases the input device."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._owns_audio and self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,315 @@
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from augment import AugmentedSelector
+from backends import get_backend
+from keymap import KEY_NAMES
+from keystroke_plan import compile_plan
+from mixer import AudioOutput, Mixer, NullAudioOutput, default_output_format
+from render import render_to_wav
+from simulate_typing import TIMING_MODEL_FILE, type_plan
+from sound_bank import SOUNDS_DIR, load_bank, release_sound
+from timing_model import TimingModel
+
+# --- Daemon Configuration ---
+# Per user: in the private runtime directory if there is one, else the home directory
+if os.environ.get("XDG_RUNTIME_DIR"):
+    SOCKET_PATH = os.path.join(os.environ["XDG_RUNTIME_DIR"], "key_imposter.sock")
+else:
+    SOCKET_PATH = os.path.expanduser("~/.key_imposter.sock")
+SOCKET_MODE = 0o600 # Only the user running the daemon may connect
+DEFAULT_PRIORITY = 0 # Higher priorities run first; equal priorities run in submission order
+
+
+class Job:
+    """One typing or render request, waiting in or taken from the daemon's queue."""
+
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.kind = request['command']
+        self.priority = int(request.get('priority', DEFAULT_PRIORITY))
+        self.submitted = time.perf_counter()
+        self.result = None
+        self.done = threading.Event()
+
+
+class TypingDaemon:
+    """
+    Keeps the output device open, sound banks loaded and the timing model in
+    memory, and runs typing and render jobs from a priority queue one at a
+    time on a worker thread. Jobs arrive through `submit`, which the socket
+    server calls for each client request.
+
+    The first bank loaded sets the mixer's format; other banks are loaded on
+    first use, converted to it, and kept. Each bank keeps one augmented
+    selector, so a key's variants are built once for the daemon's lifetime.
+    """
+
+    def __init__(self, sounds_dir=SOUNDS_DIR, backend_name='pynput', null_audio=False, model=None):
+        self.model = model
+        self.backend = get_backend(backend_name)
+        self.banks = {}
+        self.selectors = {}
+        if null_audio:
+            bank = load_bank(sounds_dir)
+        else:
+            bank = load_bank(sounds_dir, default_output_format())
+        self.format = bank.format
+        self.default_bank = sounds_dir
+        self.banks[sounds_dir] = bank
+        self.selectors[sounds_dir] = AugmentedSelector(bank)
+        # Build every key's variants now rather than on the first job that needs them
+        self.selectors[sounds_dir].warm(bank.variants)
+
+        self.mixer = Mixer(bank.channels or 1, bank.sample_width or 2)
+        output_class = NullAudioOutput if null_audio else AudioOutput
+        self.output = output_class(self.mixer, bank.rate or 44100)
+
+        self._jobs = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._current = None
+        self._worker = threading.Thread(target=self._run_jobs, daemon=True)
+
+    def start(self):
+        """Opens the output device and starts taking jobs."""
+        self.output.start()
+        self._worker.start()
+
+    def stop(self):
+        """Finishes the running job, drops the queued ones and releases the device."""
+        while True:
+            try:
+                _, _, job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            job.result = {'ok': False, 'job': job.id, 'error': "Daemon stopped before the job ran."}
+            job.done.set()
+        self._jobs.put((float('-inf'), 0, None))
+        self._worker.join()
+        self.output.close()
+
+    def bank(self, path):
+        """The bank at `path`, loaded in the mixer's format on first use."""
+        path = path or self.default_bank
+        if path not in self.banks:
+            self.banks[path] = load_bank(path, self.format)
+            self.selectors[path] = AugmentedSelector(self.banks[path])
+        return self.banks[path], self.selectors[path]
+
+    def submit(self, request):
+        """Queues a 'type' or 'render' request and returns its Job."""
+        job = Job(next(self._ids), request)
+        self._jobs.put((-job.priority, job.id, job))
+        return job
+
+    def status(self):
+        return {'ok': True, 'queued': self._jobs.qsize(),
+                'running': self._current.id if self._current else None,
+                'banks': sorted(self.banks)}
+
+    def _run_jobs(self):
+        while True:
+            _, _, job = self._jobs.get()
+            if job is None:
+                break
+            self._current = job
+            try:
+                job.result = {'ok': True, 'job': job.id, **self._run(job)}
+            except Exception as e:
+                job.result = {'ok': False, 'job': job.id, 'error': str(e)}
+            self._current = None
+            job.done.set()
+
+    def _run(self, job):
+        request = job.request
+        bank, selector = self.bank(request.get('sounds'))
+        seed = request.get('seed')
+        if job.kind == 'render':
+            # Never let a request overwrite anything but a WAV file and its sidecar
+            if not request['output'].lower().endswith('.wav'):
+                raise ValueError(f"Render output must be a .wav file, got {request['output']!r}")
+            start = time.perf_counter()
+            timestamps = render_to_wav(request['text'], request['output'], bank, seed=seed, model=self.model)
+            return {'output': request['output'], 'timestamps': timestamps,
+                    'seconds': time.perf_counter() - start}
+
+        plan = compile_plan(request['text'], seed=seed, model=self.model)
+        keys = [KEY_NAMES[sound_id] for sound_id in set(plan['sound_id'].tolist())]
+        selector.warm(keys + [release_sound(key) for key in keys])
+        start_time = time.perf_counter() + float(request.get('delay', 0.0))
+        summary = type_plan(plan, self.mixer, self.backend, selector, start_time=start_time)
+        return {'lateness': summary,
+                'queued_ms': (start_time - job.submitted) * 1000.0}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    One client connection: newline-delimited JSON requests, each answered
+    with a JSON line. With "wait", a job's result follows as a second line
+    once it has run.
+    """
+
+    def handle(self):
+        daemon = self.server.typing_daemon
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError(f"Request must be a JSON object, got {type(request).__name__}")
+                command = request.get('command')
+                if command in ('type', 'render'):
+                    job = daemon.submit(request)
+                    self._reply({'ok': True, 'job': job.id, 'queued': daemon.status()['queued']})
+                    if request.get('wait'):
+                        job.done.wait()
+                        self._reply(job.result)
+                elif command == 'status':
+                    self._reply(daemon.status())
+                elif command == 'shutdown':
+                    self._reply({'ok': True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    self._reply({'ok': False, 'error': f"Unknown command {command!r}"})
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply({'ok': False, 'error': str(e)})
+
+    def _reply(self, message):
+        self.wfile.write(json.dumps(message).encode('utf-8') + b"\n")
+        self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server handing client requests to a TypingDaemon."""
+
+    daemon_threads = True
+
+    def __init__(self, daemon, socket_path=SOCKET_PATH):
+        if os.path.exists(socket_path):
+            if daemon_running(socket_path):
+                raise FileExistsError(f"A daemon is already listening on {socket_path}")
+            # A socket left behind by a daemon that didn't exit cleanly
+            os.unlink(socket_path)
+        self.typing_daemon = daemon
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_bind(self):
+        # Created with SOCKET_MODE already set, so no other user can connect in between
+        old_umask = os.umask(0o777 & ~SOCKET_MODE)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.server_address, SOCKET_MODE)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def daemon_running(socket_path=SOCKET_PATH):
+    """True if a daemon is accepting connections on `socket_path`."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
+
+
+def serve(daemon, socket_path=SOCKET_PATH):
+    """Runs `daemon` behind a Unix socket until a client sends 'shutdown'."""
+    server = DaemonServer(daemon, socket_path)
+    daemon.start()
+    print(f"Daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+    print("Daemon stopped.")
+
+
+def send_request(request, socket_path=SOCKET_PATH):
+    """
+    Sends one request to a running daemon and returns its replies: the
+    acknowledgement, then the job result if the request asked to wait.
+    """
+    replies = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('rb') as f:
+            for line in f:
+                replies.append(json.loads(line))
+    return replies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident typing daemon and its client.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket of the daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the daemon")
+    serve_parser.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank to preload")
+    serve_parser.add_argument("--backend", default="pynput", help="Injection backend: quartz, pynput, recording or null")
+    serve_parser.add_argument("--null-audio", action="store_true", help="Mix sounds without an audio device")
+
+    for name, help_text in (("type", "Type text in the active window"), ("render", "Render text to a WAV file")):
+        job_parser = commands.add_parser(name, help=help_text)
+        job_parser.add_argument("text", help="Text to type")
+        if name == "render":
+            job_parser.add_argument("output", help="Path of the WAV file to write")
+        job_parser.add_argument("--priority", type=int, default=DEFAULT_PRIORITY, help="Higher runs first")
+        job_parser.add_argument("--sounds-dir", default=None, help="Sound bank to use instead of the preloaded one")
+        job_parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible timing")
+        job_parser.add_argument("--wait", action="store_true", help="Wait for the job and print its result")
+        if name == "type":
+            job_parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before typing")
+
+    commands.add_parser("status", help="Show the daemon's queue")
+    commands.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if daemon_running(args.socket):
+            print(f"Error: A daemon is already listening on {args.socket}.")
+            return
+        model = TimingModel.load(TIMING_MODEL_FILE) if os.path.exists(TIMING_MODEL_FILE) else None
+        serve(TypingDaemon(args.sounds_dir, args.backend, args.null_audio, model), args.socket)
+        return
+
+    if args.command in ("type", "render"):
+        request = {'command': args.command, 'text': args.text, 'priority': args.priority,
+                   'sounds': args.sounds_dir, 'seed': args.seed, 'wait': args.wait}
+        if args.command == "render":
+            request['output'] = os.path.abspath(args.output)
+        else:
+            request['delay'] = args.delay
+    elif args.command == "status":
+        request = {'command': 'status'}
+    else:
+        request = {'command': 'shutdown'}
+
+    try:
+        replies = send_request(request, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: No daemon is listening on {args.socket}. Start one with 'daemon.py serve'.")
+        return
+    for reply in replies:
+        print(json.dumps(reply))
+
+
+if __name__ == "__main__":
+    main()
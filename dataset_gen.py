@@ -0,0 +1,121 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+
+from packed_bank import PackedBank, pack_sound_dir
+from render import render_stream
+from sound_bank import SOUNDS_DIR
+from timing_model import TimingModel
+
+# --- Dataset Configuration ---
+SHARD_CHARS = 20000 # Characters of corpus text per shard
+INDEX_FILE = "index.json"
+IN_FLIGHT_PER_WORKER = 2 # Shards read ahead and queued per worker; the rest of the corpus stays on disk
+
+# Per-worker state, set up once by _init_worker
+_bank = None
+_model = None
+
+
+def split_shards(corpus_path, shard_chars=SHARD_CHARS):
+    """
+    Yields the corpus in shards of about `shard_chars` characters, cut at
+    line ends, without reading the whole file into memory.
+    """
+    lines, size = [], 0
+    with open(corpus_path, encoding="utf-8") as f:
+        for line in f:
+            lines.append(line)
+            size += len(line)
+            if size >= shard_chars:
+                yield ''.join(lines)
+                lines, size = [], 0
+    if lines:
+        yield ''.join(lines)
+
+
+def _init_worker(bank_path, model_path):
+    """
+    Opens the packed bank in each worker. It is memory-mapped read-only, so
+    every worker shares the same pages instead of loading its own copy.
+    """
+    global _bank, _model
+    _bank = PackedBank(bank_path)
+    _model = TimingModel.load(model_path) if model_path else None
+
+
+def _render_shard(job):
+    """Renders one shard to `shard_NNNNN.wav` plus its label CSV."""
+    index, text, output_dir, seed = job
+    wav_path = os.path.join(output_dir, f"shard_{index:05d}.wav")
+    shard_seed = None if seed is None else seed + index
+    labels_path = render_stream(iter([text]), wav_path, _bank, seed=shard_seed, model=_model)
+    return {
+        "shard": index,
+        "audio": os.path.basename(wav_path),
+        "labels": os.path.basename(labels_path),
+        "chars": len(text),
+    }
+
+
+def generate_dataset(corpus_path, output_dir, bank_path, workers=None, seed=None,
+                     model_path=None, shard_chars=SHARD_CHARS):
+    """
+    Renders a text corpus into sharded WAV files with per-keystroke labels
+    (key, onset, offset) across a process pool, and writes an index of the
+    shards. Returns the index entries.
+
+    Shards are read from the corpus and submitted over a sliding window of
+    IN_FLIGHT_PER_WORKER per worker, so only that many shards' text is in
+    memory at once however large the corpus.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_in_flight = IN_FLIGHT_PER_WORKER * (workers or os.cpu_count() or 1)
+    shards = []
+    in_flight = deque()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(bank_path, model_path)) as pool:
+        for i, text in enumerate(split_shards(corpus_path, shard_chars)):
+            if len(in_flight) >= max_in_flight:
+                shards.append(in_flight.popleft().get())
+            in_flight.append(pool.apply_async(_render_shard, ((i, text, output_dir, seed),)))
+        shards.extend(result.get() for result in in_flight)
+
+    with open(os.path.join(output_dir, INDEX_FILE), 'w') as f:
+        json.dump({"corpus": os.path.abspath(corpus_path), "seed": seed, "shards": shards}, f, indent=2)
+    return shards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a labeled keystroke audio dataset from a text corpus.")
+    parser.add_argument("corpus", help="Text file to render")
+    parser.add_argument("output_dir", help="Directory for the shards and index")
+    parser.add_argument("--sounds-dir", default=SOUNDS_DIR,
+                        help="Packed bank file, or a sound directory to pack first")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--shard-chars", type=int, default=SHARD_CHARS, help="Characters per shard")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible shards")
+    parser.add_argument("--timing-model", default=None, help="Timing model fitted by timing_model.py")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        bank_path = args.sounds_dir
+        if os.path.isdir(bank_path):
+            # Workers share a memory-mapped packed bank, so pack a directory once up front
+            bank_path = os.path.join(temp_dir, "bank.kbank")
+            pack_sound_dir(args.sounds_dir, bank_path)
+        shards = generate_dataset(args.corpus, args.output_dir, bank_path, args.workers, args.seed,
+                                  args.timing_model, args.shard_chars)
+    elapsed = time.perf_counter() - start
+
+    chars = sum(shard["chars"] for shard in shards)
+    print(f"Rendered {len(shards)} shards ({chars} chars) to {args.output_dir} in {elapsed:.2f}s "
+          f"({chars / elapsed:.0f} chars/sec)")
+
+
+if __name__ == "__main__":
+    main()
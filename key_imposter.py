@@ -0,0 +1,57 @@
+import argparse
+import importlib
+import sys
+
+# --- Commands ---
+# Subcommand -> (module whose main() runs it, help). A module is imported
+# only when its command runs, so help and dispatch never pay for NumPy,
+# PyAudio, pynput or Quartz.
+COMMANDS = {
+    'record': ('record_keys', "Record keystroke sounds one prompted key at a time"),
+    'record-session': ('record_keys_old', "Record keystroke sounds and a key log while typing freely"),
+    'simulate': ('simulate_typing', "Type text into the active window with keystroke sounds"),
+    'stream': ('stream_typing', "Type text from a file or stdin as it arrives"),
+    'render': ('render', "Render the sound of typing a text to a WAV file"),
+    'bench': ('bench', "Benchmark the typing and recording pipelines"),
+    'dataset': ('dataset_gen', "Generate a labeled keystroke audio dataset from a text corpus"),
+    'pack': ('packed_bank', "Pack a sound directory into a single memory-mapped bank file"),
+    'fit-timing': ('timing_model', "Fit a typing timing model from recorded key logs"),
+    'segment': ('segment_session', "Build a sound bank from a long recording of natural typing"),
+    'recognize': ('recognize', "Identify the keys typed in a recording of real typing"),
+    'keylog': ('key_log', "Record a typing session as a binary key log, or replay one"),
+    'daemon': ('daemon', "Run the resident typing daemon, or send it jobs"),
+}
+
+# Cold-start budget, in seconds of wall time from a fresh interpreter:
+# `key_imposter --help`, and `key_imposter <command> --help` with the
+# command's imports. Measured by bench.py.
+HELP_BUDGET_SECONDS = 0.1
+COMMAND_BUDGET_SECONDS = 0.3
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="key_imposter",
+        description="Record, simulate and render keyboard typing sounds.",
+        epilog="Run 'key_imposter <command> --help' for a command's options.")
+    commands = parser.add_subparsers(dest="command", metavar="<command>", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        # The command's own parser handles its arguments, including --help
+        commands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args, rest = build_parser().parse_known_args(argv)
+    module_name, _ = COMMANDS[args.command]
+
+    # Run the command's module as if it had been started directly, so its
+    # usage reads `key_imposter <command>`
+    module = importlib.import_module(module_name)
+    sys.argv = [f"key_imposter {args.command}"] + rest
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
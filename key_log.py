@@ -0,0 +1,187 @@
+import argparse
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from keymap import KEY_IDS, KEY_NAMES, SHIFTED_CHARS
+from mixer import AudioOutput, Mixer, default_output_format
+from scheduler import DeadlineScheduler, format_summary, lateness_summary
+from sound_bank import SOUNDS_DIR, VariantSelector, load_bank
+
+# --- Key Log Format ---
+# A magic header, then fixed-width little-endian records, one per key event
+MAGIC = b"KEYLOG01"
+LOG_DTYPE = np.dtype([('time_ns', '<i8'), ('key_id', '<u2'), ('pressed', 'u1')])
+LOG_EXT = ".keylog"
+FLUSH_RECORDS = 4096 # Records buffered in memory before they are handed to the writer thread
+
+# pynput names for keys logged as another key in keymap
+KEY_ALIASES = {'shift_r': 'shift', 'ctrl_r': 'control', 'alt_r': 'option', 'cmd_r': 'command'}
+
+
+def normalize_key(key):
+    """The keymap name of a recorded key: shifted characters become the key that types them."""
+    return KEY_ALIASES.get(key, SHIFTED_CHARS.get(key, key))
+
+
+class KeyLogWriter:
+    """
+    Appends key events to a binary key log without blocking the caller.
+
+    `append` only fills a row of a preallocated record array; full arrays
+    are passed to a writer thread, which does all the file I/O. Meant to be
+    called from a single thread, such as a pynput listener callback.
+    """
+
+    def __init__(self, path, flush_records=FLUSH_RECORDS):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._flush_records = flush_records
+        self._buffer = np.empty(flush_records, dtype=LOG_DTYPE)
+        self._used = 0
+        self._pending = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while (records := self._pending.get()) is not None:
+            self._file.write(records.tobytes())
+        self._file.close()
+
+    def append(self, key, pressed, time_ns=None):
+        """
+        Logs a press or release of `key`, at `time_ns` (now by default).
+        Shifted characters are logged as the key that types them; keys not
+        in the keymap are skipped.
+        """
+        key_id = KEY_IDS.get(normalize_key(key))
+        if key_id is None:
+            return
+        self._buffer[self._used] = (time.monotonic_ns() if time_ns is None else time_ns, key_id, pressed)
+        self._used += 1
+        self.count += 1
+        if self._used == self._flush_records:
+            self._pending.put(self._buffer)
+            self._buffer = np.empty(self._flush_records, dtype=LOG_DTYPE)
+            self._used = 0
+
+    def close(self):
+        """Writes out the buffered records and closes the file."""
+        if self._writer.is_alive():
+            self._pending.put(self._buffer[:self._used])
+            self._pending.put(None)
+            self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_key_log(path):
+    """Reads a binary key log into a LOG_DTYPE record array. A partly written last record is ignored."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a key log")
+    count = (os.path.getsize(path) - len(MAGIC)) // LOG_DTYPE.itemsize
+    return np.fromfile(path, dtype=LOG_DTYPE, count=count, offset=len(MAGIC))
+
+
+def record_session(path):
+    """Logs every key press and release until Escape is pressed."""
+    from pynput import keyboard
+
+    from record_keys_old import get_key_name
+
+    with KeyLogWriter(path) as log:
+        def on_press(key):
+            if key == keyboard.Key.esc:
+                return False
+            log.append(get_key_name(key), True)
+
+        def on_release(key):
+            log.append(get_key_name(key), False)
+
+        print("Recording key events. Press 'Esc' to stop.")
+        with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
+            listener.join()
+    print(f"Saved {log.count} key events to {path}")
+
+
+def replay_log(records, backend, mixer=None, selector=None, start_time=None):
+    """
+    Replays key log records with their original timing: every press and
+    release goes to `backend`, and each press also plays its sound on
+    `mixer` if one is given. Events run at absolute deadlines, so the
+    replayed intervals match the log to within the scheduler's lateness,
+    which is returned as a summary.
+    """
+    if not len(records):
+        return lateness_summary([])
+    records = np.sort(records, order='time_ns')
+    offsets = (records['time_ns'] - records['time_ns'][0]) / 1e9
+    keys = [KEY_NAMES[key_id] for key_id in records['key_id'].tolist()]
+    pressed = records['pressed'].astype(bool).tolist()
+
+    def replay_event(i):
+        if pressed[i]:
+            if mixer is not None:
+                mixer.play(selector.next(keys[i]), i)
+            backend.press(keys[i])
+        else:
+            backend.release(keys[i])
+
+    return DeadlineScheduler(offsets).run(replay_event, start_time=start_time)
+
+
+def replay_session(path, bank=None, backend=None, countdown=5):
+    """Replays a key log into the active window with the keystroke sounds of `bank`."""
+    from backends import PynputBackend
+
+    records = load_key_log(path)
+    if bank is None:
+        bank = load_bank(SOUNDS_DIR, default_output_format())
+    if backend is None:
+        backend = PynputBackend()
+
+    print("Click on the window where you want the session replayed.")
+    for i in range(countdown, 0, -1):
+        print(f"Starting in {i}...", end='\r', flush=True)
+        time.sleep(1)
+    print("Replaying...                ")
+
+    mixer = Mixer(bank.channels or 1, bank.sample_width or 2)
+    with AudioOutput(mixer, bank.rate or 44100) as output:
+        summary = replay_log(records, backend, mixer, VariantSelector(bank))
+        output.wait_until_idle()
+    print(f"Timing: {format_summary(summary)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a typing session as a binary key log, or replay one.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Log key presses and releases until Esc")
+    record.add_argument("path", help=f"Key log to write ({LOG_EXT})")
+    replay = commands.add_parser("replay", help="Replay a key log with its original timing")
+    replay.add_argument("path", help="Key log to replay")
+    replay.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank directory or packed bank file")
+    replay.add_argument("--backend", default="pynput", help="Injection backend: quartz, pynput, recording or null")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_session(args.path)
+    else:
+        from backends import get_backend
+
+        bank = load_bank(args.sounds_dir, default_output_format())
+        replay_session(args.path, bank, get_backend(args.backend))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# --- Key Code Mapping ---
+# macOS virtual key codes (US ANSI layout) by key name. Names match the sound
+# bank's file names and the recorder's SPECIAL_KEY_MAP.
+KEY_CODES = {
+    'a': 0x00, 's': 0x01, 'd': 0x02, 'f': 0x03, 'h': 0x04,
+    'g': 0x05, 'z': 0x06, 'x': 0x07, 'c': 0x08, 'v': 0x09,
+    'b': 0x0B, 'q': 0x0C, 'w': 0x0D, 'e': 0x0E, 'r': 0x0F,
+    'y': 0x10, 't': 0x11, 'o': 0x1F, 'u': 0x20, 'i': 0x22,
+    'p': 0x23, 'l': 0x25, 'j': 0x26, 'k': 0x28, 'n': 0x2D,
+    'm': 0x2E,
+    '1': 0x12, '2': 0x13, '3': 0x14, '4': 0x15, '5': 0x17,
+    '6': 0x16, '7': 0x1A, '8': 0x1C, '9': 0x19, '0': 0x1D,
+    '-': 0x1B, '=': 0x18, '[': 0x21, ']': 0x1E, '\\': 0x2A,
+    ';': 0x29, "'": 0x27, ',': 0x2B, '.': 0x2F, '/': 0x2C,
+    '`': 0x32,
+    ' ': 0x31,
+    'return': 0x24,
+    'tab': 0x30,
+    'backspace': 0x33,
+    'escape': 0x35,
+    'command': 0x37,
+    'shift': 0x38,
+    'option': 0x3A,
+    'control': 0x3B,
+}
+
+# Every key name, in a fixed order; a key's position is its id
+KEY_NAMES = tuple(KEY_CODES)
+KEY_IDS = {name: i for i, name in enumerate(KEY_NAMES)}
+KEY_NAMES_BY_CODE = {code: name for name, code in KEY_CODES.items()}
+
+# Horizontal position of each key's centre on the keyboard, in key widths
+# from the left edge, for panning its sound
+KEY_POSITIONS = {}
+for _offset, _row in ((0.5, "`1234567890-="), (2.0, "qwertyuiop[]\\"),
+                      (2.25, "asdfghjkl;'"), (2.75, "zxcvbnm,./")):
+    for _column, _char in enumerate(_row):
+        KEY_POSITIONS[_char] = _offset + _column
+KEY_POSITIONS.update({
+    ' ': 7.5, 'return': 14.0, 'tab': 0.75, 'backspace': 14.25, 'escape': 0.5,
+    'shift': 1.0, 'control': 0.5, 'option': 1.75, 'command': 3.0,
+})
+KEYBOARD_WIDTH = 15.0
+
+# Modifier keys, in the order they are pressed for a chord, and their flag bits
+MODIFIERS = ('control', 'option', 'shift', 'command')
+MODIFIER_FLAGS = {'shift': 1, 'control': 2, 'option': 4, 'command': 8}
+
+# Characters typed with a named key rather than the character itself
+CHAR_KEYS = {'\n': 'return', '\t': 'tab', '\b': 'backspace'}
+
+# Characters typed by holding Shift, and the key that types them
+SHIFTED_CHARS = {
+    '!': '1', '@': '2', '#': '3', '$': '4', '%': '5',
+    '^': '6', '&': '7', '*': '8', '(': '9', ')': '0',
+    '_': '-', '+': '=', '{': '[', '}': ']', '|': '\\',
+    ':': ';', '"': "'", '<': ',', '>': '.', '?': '/',
+    '~': '`',
+}
+SHIFTED_CHARS.update({char.upper(): char for char in 'abcdefghijklmnopqrstuvwxyz'})
+
+
+def char_to_key(char):
+    """Returns (key name, modifier flags) that type `char`, or None if it can't be typed."""
+    if char in SHIFTED_CHARS:
+        return SHIFTED_CHARS[char], MODIFIER_FLAGS['shift']
+    key = CHAR_KEYS.get(char, char)
+    if key in KEY_CODES:
+        return key, 0
+    return None
+
+
+# The character each (key code, flags) pair types, for backends that inject characters
+CHARS_BY_KEY = {}
+for _code in range(128):
+    _key = char_to_key(chr(_code))
+    if _key is not None:
+        CHARS_BY_KEY[(KEY_CODES[_key[0]], _key[1])] = chr(_code)
@@ -0,0 +1,166 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from keymap import CHARS_BY_KEY, KEY_CODES, KEY_IDS, char_to_key
+from timing import build_holds, build_timeline
+
+# --- Plan Configuration ---
+# One keystroke of a plan: the key to post, the modifiers held for it, the
+# sound to play (an id into keymap.KEY_NAMES), its start time and how long
+# the key is held down, in seconds
+PLAN_DTYPE = np.dtype([
+    ('key_code', np.uint16),
+    ('flags', np.uint8),
+    ('sound_id', np.int16),
+    ('offset', np.float64),
+    ('hold', np.float64),
+])
+# One key down or key up of a plan's timeline: when, which keystroke, and which
+EVENT_DTYPE = np.dtype([
+    ('offset', np.float64),
+    ('index', np.int64),
+    ('down', np.bool_),
+])
+REPEAT_GAP = 0.005 # A repeated key is released at least this long before it is pressed again
+CACHE_SIZE = 64 # Compiled texts kept for reuse
+CHUNK_CHARS = 256 # Most characters compiled at once when streaming
+ASCII_SIZE = 128
+
+# Keystroke for every ASCII character; characters that can't be typed are marked
+_TYPEABLE = np.zeros(ASCII_SIZE + 1, dtype=bool)
+_ASCII_KEYS = np.zeros(ASCII_SIZE + 1, dtype=PLAN_DTYPE)
+for _code in range(ASCII_SIZE):
+    _key = char_to_key(chr(_code))
+    if _key is not None:
+        _TYPEABLE[_code] = True
+        _ASCII_KEYS[_code] = (KEY_CODES[_key[0]], _key[1], KEY_IDS[_key[0]], 0.0, 0.0)
+
+# Compiled keystrokes by text digest, least recently used first
+_plan_cache = OrderedDict()
+
+
+def _compile_keys(text):
+    """
+    Turns `text` into keystrokes (without timing) with one table lookup per
+    character. Returns (the characters that can be typed, their keystrokes).
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    codes = np.minimum(codes, ASCII_SIZE)
+    typeable = _TYPEABLE[codes]
+    if not typeable.all():
+        skipped = sorted({char for char, ok in zip(text, typeable) if not ok})
+        print(f"Warning: Characters {skipped} cannot be typed on a US layout, skipping.")
+        text = ''.join(char for char, ok in zip(text, typeable) if ok)
+    return text, _ASCII_KEYS[codes[typeable]]
+
+
+def compile_plan(text, seed=None, model=None, interval=None):
+    """
+    Compiles `text` into a flat array of PLAN_DTYPE keystrokes covering the
+    full US layout, shifted symbols included.
+
+    Keystrokes are cached by the text's content hash, so a repeated text is
+    only compiled once; offsets are drawn fresh each call from the timing
+    model, or spaced `interval` seconds apart if given, and so are hold
+    durations.
+    """
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    cached = _plan_cache.get(digest)
+    if cached is None:
+        cached = _compile_keys(text)
+        _plan_cache[digest] = cached
+        if len(_plan_cache) > CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+    else:
+        _plan_cache.move_to_end(digest)
+
+    typed_text, keys = cached
+    plan = keys.copy()
+    if interval is not None:
+        plan['offset'] = np.arange(len(plan)) * interval
+    else:
+        plan['offset'] = build_timeline(typed_text, seed=seed, model=model)
+    plan['hold'] = build_holds(typed_text, seed=seed, model=model)
+    return plan
+
+
+def plan_events(plan, repeat_gap=REPEAT_GAP):
+    """
+    Lays out every key down and key up of a plan on one timeline, as an
+    EVENT_DTYPE array sorted by time.
+
+    Keys are released `hold` seconds after they are pressed, so a key can
+    still be down when the next ones go down (rollover). A key is always
+    released `repeat_gap` before it is pressed again, and a key typed with
+    modifiers before the next key goes down, so a held Shift never changes
+    the next character. On a tie a key up goes before a key down, except
+    that a key is never released before its own press, even when its hold
+    is clipped to nothing.
+    """
+    count = len(plan)
+    hold = plan['hold'].copy()
+
+    # Shorten holds that would run into the next press of the same key
+    order = np.lexsort((np.arange(count), plan['key_code']))
+    repeats = plan['key_code'][order][1:] == plan['key_code'][order][:-1]
+    current, following = order[:-1][repeats], order[1:][repeats]
+    room = plan['offset'][following] - plan['offset'][current] - repeat_gap
+    hold[current] = np.clip(np.minimum(hold[current], room), 0.0, None)
+
+    # Release chords before the next key
+    chords = np.flatnonzero(plan['flags'][:-1] != 0)
+    room = plan['offset'][chords + 1] - plan['offset'][chords] - repeat_gap
+    hold[chords] = np.clip(np.minimum(hold[chords], room), 0.0, None)
+
+    events = np.zeros(2 * count, dtype=EVENT_DTYPE)
+    events['offset'][:count] = plan['offset']
+    events['offset'][count:] = plan['offset'] + hold
+    events['index'][:count] = events['index'][count:] = np.arange(count)
+    events['down'][:count] = True
+    # Ties go in keystroke order, each key down just before its own key up
+    rank = 2 * events['index'] + ~events['down']
+    return events[np.lexsort((rank, events['offset']))]
+
+
+def read_chunks(source, chunk_chars=CHUNK_CHARS):
+    """
+    Yields text from `source` in pieces of at most `chunk_chars` characters.
+    `source` is a file object (read a line at a time, so a live pipe is
+    typed as lines arrive), a path, or an iterator of strings.
+    """
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            yield from read_chunks(f, chunk_chars)
+        return
+
+    if hasattr(source, "readline"):
+        pieces = iter(lambda: source.readline(chunk_chars), '')
+    else:
+        pieces = iter(source)
+    for piece in pieces:
+        for i in range(0, len(piece), chunk_chars):
+            yield piece[i:i + chunk_chars]
+
+
+def stream_plans(chunks, model=None, seed=None):
+    """
+    Compiles each chunk into a keystroke plan whose offsets continue from the
+    previous chunk. The last key of a chunk is compiled again in front of the
+    next one, so the delay across the boundary follows the same digraph
+    timing as the rest of the text.
+    """
+    carry = ''
+    last_offset = 0.0
+    for index, chunk in enumerate(chunks):
+        chunk_seed = None if seed is None else seed + index
+        plan = compile_plan(carry + chunk, seed=chunk_seed, model=model)
+        if carry:
+            plan['offset'] += last_offset - plan['offset'][0]
+            plan = plan[1:]
+        if not len(plan):
+            continue
+        carry = CHARS_BY_KEY[(int(plan['key_code'][-1]), int(plan['flags'][-1]))]
+        last_offset = plan['offset'][-1]
+        yield plan
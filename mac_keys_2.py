@@ -1,71 +1,88 @@
 import time
 import os
-import pygame
-from Quartz import (
-    CGEventCreateKeyboardEvent,
-    CGEventPost,
-    kCGHIDEventTap,
-    kCGEventKeyDown,
-    kCGEventKeyUp,
-    CGEventSourceCreate,
-    kCGEventSourceStateHIDSystemState,
-    CGEventSetFlags,
-    kCGEventFlagMaskShift,
-    kCGEventFlagMaskCommand,
-    kCGEventFlagMaskControl,
-    kCGEventFlagMaskAlternate
-)
+
+from backends import key_event_runner, quartz_backend
+from keymap import KEY_CODES, KEY_NAMES
+from keystroke_plan import compile_plan, plan_events
+from scheduler import DeadlineScheduler, format_summary
 
 # --- Sound Configuration ---
 SOUND_DIR = "keyboard_sounds"
-try:
-    # Initialize the pygame mixer
-    pygame.mixer.init()
-    # Load sounds into a dictionary for fast access
-    SOUNDS = {
-        'default': pygame.mixer.Sound(os.path.join(SOUND_DIR, "key_press.wav")),
-        'space': pygame.mixer.Sound(os.path.join(SOUND_DIR, "space_press.wav")),
-        'enter': pygame.mixer.Sound(os.path.join(SOUND_DIR, "enter_press.wav")),
-        'backspace': pygame.mixer.Sound(os.path.join(SOUND_DIR, "backspace_press.wav")),
-    }
-    print("Keyboard sounds loaded successfully.")
-except (pygame.error, FileNotFoundError) as e:
-    print(f"Warning: Could not load sounds. Running in silent mode. Error: {e}")
-    SOUNDS = None
-
+SOUNDS = None # Loaded by load_sounds() on first use, not at import
+_sounds_loaded = False
+
+
+def load_sounds():
+    """Initializes the pygame mixer and loads the keyboard sounds, the first time only."""
+    global SOUNDS, _sounds_loaded
+    if _sounds_loaded:
+        return SOUNDS
+    _sounds_loaded = True
+
+    import pygame
+    try:
+        # Initialize the pygame mixer
+        pygame.mixer.init()
+        # Load sounds into a dictionary for fast access
+        SOUNDS = {
+            'default': pygame.mixer.Sound(os.path.join(SOUND_DIR, "key_press.wav")),
+            'space': pygame.mixer.Sound(os.path.join(SOUND_DIR, "space_press.wav")),
+            'enter': pygame.mixer.Sound(os.path.join(SOUND_DIR, "enter_press.wav")),
+            'backspace': pygame.mixer.Sound(os.path.join(SOUND_DIR, "backspace_press.wav")),
+        }
+        # Key-up sound, optional
+        release_path = os.path.join(SOUND_DIR, "key_release.wav")
+        if os.path.exists(release_path):
+            SOUNDS['release'] = pygame.mixer.Sound(release_path)
+        print("Keyboard sounds loaded successfully.")
+    except (pygame.error, FileNotFoundError) as e:
+        print(f"Warning: Could not load sounds. Running in silent mode. Error: {e}")
+        SOUNDS = None
+    return SOUNDS
+
+
+# --- Typing Rate ---
+KEY_INTERVAL = 0.06 # Seconds from one key press to the next in type_string
 
 # --- Key Code Mapping (Extended) ---
-key_code_map = {
-    'a': 0x00, 's': 0x01, 'd': 0x02, 'f': 0x03, 'h': 0x04,
-    'g': 0x05, 'z': 0x06, 'x': 0x07, 'c': 0x08, 'v': 0x09,
-    'b': 0x0B, 'q': 0x0C, 'w': 0x0D, 'e': 0x0E, 'r': 0x0F,
-    'y': 0x10, 't': 0x11, 'o': 0x1F, 'u': 0x20, 'i': 0x22,
-    'p': 0x23, 'l': 0x25, 'j': 0x26, 'k': 0x28, 'n': 0x2D,
-    'm': 0x2E,
-    ' ': 0x31,
-    'return': 0x24,
-    'backspace': 0x33,
-    'escape': 0x35,
-    'command': 0x37,
-    'shift': 0x38,
-    'option': 0x3A,
-    'control': 0x3B,
-}
+key_code_map = KEY_CODES
+
 
 def press_key_with_sound(key_name, flags=0):
     """
     Simulates a single key press and release, with accompanying sound.
-    `key_name` should be a string from the key_code_map.
+    `key_name` should be a string from the key_code_map. Returns at once;
+    to hold keys or pace them, use `key_down_with_sound` and
+    `key_up_with_sound` from a scheduler, as `type_string` does.
     """
     key_code = key_code_map.get(key_name)
     if key_code is None:
         print(f"Warning: Key '{key_name}' not found in key_code_map, skipping.")
         return
 
-    # --- Play Sound ---
-    if SOUNDS:
+    key_down_with_sound(key_name, key_code, flags)
+    key_up_with_sound(key_name, key_code)
+
+
+def key_down_with_sound(key_name, key_code, flags=0):
+    """Posts the key down for `key_code` with its press sound."""
+    play_key_sound(key_name)
+    quartz_backend().post_key(key_code, True, flags)
+
+
+def key_up_with_sound(key_name, key_code):
+    """Posts the key up for `key_code` with its release sound, if there is one."""
+    play_key_sound(key_name, released=True)
+    quartz_backend().post_key(key_code, False, 0) # Release modifiers on key up
+
+
+def play_key_sound(key_name, released=False):
+    """Plays the press (or release) sound for `key_name`, if sounds could be loaded."""
+    if load_sounds():
         # Determine which sound to play
-        if key_name == ' ':
+        if released:
+            sound_to_play = SOUNDS.get('release')
+        elif key_name == ' ':
             sound_to_play = SOUNDS.get('space')
         elif key_name == 'return':
             sound_to_play = SOUNDS.get('enter')
@@ -79,39 +96,30 @@ def press_key_with_sound(key_name, flags=0):
             # .play() is non-blocking, perfect for our use case
             sound_to_play.play()
 
-    # --- Post Keystroke Event ---
-    source = CGEventSourceCreate(kCGEventSourceStateHIDSystemState)
-    keyDown = CGEventCreateKeyboardEvent(source, key_code, True)
-    keyUp = CGEventCreateKeyboardEvent(source, key_code, False)
 
-    if flags:
-        CGEventSetFlags(keyDown, flags)
-        CGEventSetFlags(keyUp, 0) # Release modifiers on key up
-
-    CGEventPost(kCGHIDEventTap, keyDown)
-    time.sleep(0.01) # A small delay can help the target app process the event
-    CGEventPost(kCGHIDEventTap, keyUp)
-    time.sleep(0.05) # Delay after key press for realism
-
-
-def type_string(text):
+def type_string(text, interval=KEY_INTERVAL, telemetry=None):
     """
     Types a string character by character with sound.
-    Handles uppercase letters by simulating a Shift press.
+    The text is compiled once into keystrokes covering the full US layout,
+    shifted symbols included, and keys go down exactly `interval` seconds
+    apart. Each key goes up after its own hold time as a separate event on
+    the same timeline, so fast keys overlap as in real rollover.
+    An optional `telemetry` times the schedule, sound and inject stages.
     """
-    for char in text:
-        key_name = char.lower()
-        flags = 0
-
-        if 'a' <= char <= 'z':
-            press_key_with_sound(key_name)
-        elif 'A' <= char <= 'Z':
-            # For uppercase, press Shift + key
-            press_key_with_sound(key_name, flags=kCGEventFlagMaskShift)
-        elif char == ' ':
-            press_key_with_sound(' ')
-        else:
-            print(f"Warning: Character '{char}' cannot be typed directly, skipping.")
+    # Load sounds and open the event source before the first deadline
+    load_sounds()
+    backend = quartz_backend()
+
+    plan = compile_plan(text, interval=interval)
+    events = plan_events(plan)
+    sound_keys = [KEY_NAMES[sound_id] for sound_id in plan['sound_id'].tolist()]
+
+    def play(i, key, down):
+        play_key_sound(sound_keys[key], released=not down)
+
+    key_event = key_event_runner(plan, events, backend, play, telemetry)
+    scheduler = DeadlineScheduler(events['offset'])
+    return scheduler.run(key_event, telemetry=telemetry)
 
 
 def press_hotkey(key_name, *modifiers):
@@ -129,6 +137,8 @@ def press_hotkey(key_name, *modifiers):
 
 
 if __name__ == "__main__":
+    from Quartz import kCGEventFlagMaskCommand
+
     # --- Example Usage ---
     print("Starting keystroke injection with sound in 5 seconds...")
     print("Quickly switch to a text editor or any input field.")
@@ -136,18 +146,15 @@ if __name__ == "__main__":
 
     # Example 1: Type a string with custom sounds
     print("Typing 'Hello World'...")
-    type_string("Hello World")
-    press_key_with_sound('return')
-    press_key_with_sound('return')
+    summary = type_string("Hello World")
+    print(f"Timing: {format_summary(summary)}")
+    type_string("\n\n")
     
     # Example 2: Demonstrate backspace sound
     type_string("oops")
     time.sleep(0.5)
     print("Correcting a typo...")
-    press_key_with_sound('backspace')
-    press_key_with_sound('backspace')
-    press_key_with_sound('backspace')
-    press_key_with_sound('backspace')
+    type_string("\b\b\b\b")
 
     # Example 3: Simulate hotkeys
     print("Simulating Command-A (Select All)...")
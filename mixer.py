@@ -0,0 +1,203 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+from sound_bank import float_to_pcm
+from telemetry import AUDIO_START
+
+# --- Output Configuration ---
+BLOCK_SIZE = 256 # Frames per output block (~6 ms at 44.1kHz)
+
+
+def default_output_format(sample_width=2, max_channels=2):
+    """
+    The (sample width, channels, rate) to load sounds in so they match the
+    default output device and it never has to convert.
+    """
+    import pyaudio
+
+    audio = pyaudio.PyAudio()
+    try:
+        info = audio.get_default_output_device_info()
+        channels = max(1, min(max_channels, int(info['maxOutputChannels'])))
+        return (sample_width, channels, int(info['defaultSampleRate']))
+    finally:
+        audio.terminate()
+
+
+class Mixer:
+    """
+    Sums any number of overlapping keystroke sounds into fixed-size blocks.
+
+    `play()` only queues a reference to a preloaded sample array, so it is
+    cheap to call from the typing loop. The audio callback pulls queued
+    sounds into the active voice list and mixes every voice into the block
+    with NumPy slice adds.
+    """
+
+    def __init__(self, channels, sample_width=2, telemetry=None):
+        self.channels = channels
+        self.sample_width = sample_width
+        self.telemetry = telemetry
+        self._pending = collections.deque() # Appends and pops are thread-safe
+        self._voices = [] # [samples, position] pairs, only touched by the mixing thread
+
+    def play(self, samples, event=None):
+        """
+        Queues float32 samples of shape (n_frames, channels) for playback.
+        `event` is the keystroke number its start is reported under in telemetry.
+        """
+        if samples is not None and len(samples):
+            self._pending.append((samples, event))
+
+    def is_idle(self):
+        """True when nothing is queued or still playing."""
+        return not self._pending and not self._voices
+
+    def mix(self, frame_count, output_time=None):
+        """
+        Mixes the next `frame_count` frames of all active sounds into a float32
+        block. `output_time` is when the block will be heard, for telemetry.
+        """
+        while self._pending:
+            # Add the voice before popping it, so is_idle() never sees the sound in neither list
+            samples, event = self._pending[0]
+            self._voices.append([samples, 0])
+            self._pending.popleft()
+            if self.telemetry is not None and event is not None and output_time is not None:
+                self.telemetry.mark(event, AUDIO_START, output_time)
+
+        block = np.zeros((frame_count, self.channels), dtype=np.float32)
+        still_playing = []
+        for voice in self._voices:
+            samples, position = voice
+            n = min(frame_count, len(samples) - position)
+            block[:n] += samples[position:position + n]
+            voice[1] = position + n
+            if voice[1] < len(samples):
+                still_playing.append(voice)
+        self._voices = still_playing
+        return block
+
+    def mix_pcm(self, frame_count, output_time=None):
+        """Like `mix()`, but clipped and converted to PCM bytes for the device."""
+        return float_to_pcm(self.mix(frame_count, output_time), self.sample_width)
+
+
+class AudioOutput:
+    """
+    One long-lived, callback-mode PyAudio output stream fed by a Mixer.
+
+    The device is opened once and stays open, so playing a sound never
+    creates a thread or a stream.
+    """
+
+    def __init__(self, mixer, rate, block_size=BLOCK_SIZE):
+        self.mixer = mixer
+        self.rate = rate
+        self.block_size = block_size
+        self._audio = None
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        # The stream reports when this block reaches the DAC on its own clock;
+        # shift that to perf_counter time for telemetry
+        output_time = None
+        if self.mixer.telemetry is not None:
+            output_time = time.perf_counter()
+            if time_info and time_info.get('output_buffer_dac_time'):
+                output_time += time_info['output_buffer_dac_time'] - time_info['current_time']
+        return (self.mixer.mix_pcm(frame_count, output_time), self._continue)
+
+    def start(self):
+        """Opens the output device and starts pulling blocks from the mixer."""
+        # Imported here so the mixer itself can be used without an audio device
+        import pyaudio
+
+        self._continue = pyaudio.paContinue
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(
+            format=self._audio.get_format_from_width(self.mixer.sample_width),
+            channels=self.mixer.channels,
+            rate=self.rate,
+            output=True,
+            frames_per_buffer=self.block_size,
+            stream_callback=self._callback)
+        self._stream.start_stream()
+
+    def wait_until_idle(self, poll_interval=0.01):
+        """Blocks until every queued sound has finished playing."""
+        while not self.mixer.is_idle():
+            time.sleep(poll_interval)
+
+    def close(self):
+        """Stops the stream and releases the audio device."""
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._audio is not None:
+            self._audio.terminate()
+            self._audio = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class NullAudioOutput:
+    """
+    Stand-in for AudioOutput that pulls blocks from the mixer at the real
+    output rate on a background thread and throws them away. Lets the
+    whole pipeline run on machines with no audio device.
+    """
+
+    def __init__(self, mixer, rate, block_size=BLOCK_SIZE):
+        self.mixer = mixer
+        self.rate = rate
+        self.block_size = block_size
+        self.blocks_mixed = 0
+        self._running = False
+        self._thread = None
+
+    def _run(self):
+        block_seconds = self.block_size / self.rate
+        next_block = time.perf_counter()
+        while self._running:
+            output_time = next_block if self.mixer.telemetry is not None else None
+            self.mixer.mix_pcm(self.block_size, output_time)
+            self.blocks_mixed += 1
+            next_block += block_seconds
+            delay = next_block - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def start(self):
+        """Starts pulling blocks from the mixer."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def wait_until_idle(self, poll_interval=0.01):
+        """Blocks until every queued sound has been mixed."""
+        while not self.mixer.is_idle():
+            time.sleep(poll_interval)
+
+    def close(self):
+        """Stops the mixing thread."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,83 @@
+import numpy as np
+
+# --- Onset Detection Configuration ---
+FRAME_SIZE = 256 # Samples per analysis frame
+HOP_SIZE = 64    # Samples between frame starts (~1.5 ms at 44.1kHz)
+THRESHOLD = 8.0  # Onset threshold, in median absolute deviations above the noise floor
+SILENCE_DB = -40.0 # A sound has ended once its energy falls this far below the peak
+
+
+def to_mono(samples):
+    """Returns a 1-D float32 signal from samples of shape (n,) or (n, channels)."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim == 2:
+        samples = samples.mean(axis=1)
+    return samples
+
+
+def frame_signal(signal, frame_size=FRAME_SIZE, hop=HOP_SIZE):
+    """Views a 1-D signal as overlapping frames of shape (n_frames, frame_size) without copying."""
+    if len(signal) < frame_size:
+        signal = np.pad(signal, (0, frame_size - len(signal)))
+    return np.lib.stride_tricks.sliding_window_view(signal, frame_size)[::hop]
+
+
+def frame_energy(signal, frame_size=FRAME_SIZE, hop=HOP_SIZE):
+    """Mean energy of every frame of a 1-D signal."""
+    frames = frame_signal(signal, frame_size, hop)
+    return np.einsum('ij,ij->i', frames, frames) / frame_size
+
+
+def onset_strength(signal, frame_size=FRAME_SIZE, hop=HOP_SIZE):
+    """
+    Half-wave rectified spectral flux of every frame, computed with one
+    batched FFT over all frames.
+    """
+    frames = frame_signal(signal, frame_size, hop) * np.hanning(frame_size).astype(np.float32)
+    magnitudes = np.abs(np.fft.rfft(frames, axis=1))
+    flux = np.diff(magnitudes, axis=0, prepend=magnitudes[:1])
+    return np.maximum(flux, 0.0).sum(axis=1)
+
+
+def onset_threshold(strength, threshold=THRESHOLD):
+    """Adaptive threshold: noise floor (median) plus `threshold` median absolute deviations."""
+    floor = np.median(strength)
+    spread = np.median(np.abs(strength - floor))
+    return floor + threshold * max(spread, 1e-6)
+
+
+def detect_onset(samples, frame_size=FRAME_SIZE, hop=HOP_SIZE, threshold=THRESHOLD):
+    """
+    Finds the sample index where the first keystroke transient starts,
+    or None if nothing rises above the background noise.
+    """
+    strength = onset_strength(to_mono(samples), frame_size, hop)
+    above = np.flatnonzero(strength > onset_threshold(strength, threshold))
+    if not len(above):
+        return None
+    return int(above[0]) * hop
+
+
+def find_sound_end(samples, onset, max_length, frame_size=FRAME_SIZE, hop=HOP_SIZE,
+                   silence_db=SILENCE_DB):
+    """
+    Finds where the sound starting at `onset` has decayed to `silence_db`
+    below its peak, searching at most `max_length` samples.
+    """
+    signal = to_mono(samples)[onset:onset + max_length]
+    energy = frame_energy(signal, frame_size, hop)
+    loud = np.flatnonzero(energy >= energy.max() * 10 ** (silence_db / 10))
+    return onset + min(len(signal), int(loud[-1]) * hop + frame_size)
+
+
+def trim_keystroke(samples, rate, pre_pad=0.005, max_seconds=0.3):
+    """
+    Cuts a single keystroke out of a longer window: from just before its
+    onset to where it fades out. Returns None if no onset is found.
+    """
+    onset = detect_onset(samples)
+    if onset is None:
+        return None
+    start = max(0, onset - int(pre_pad * rate))
+    end = find_sound_end(samples, onset, int(max_seconds * rate))
+    return samples[start:end]
@@ -0,0 +1,187 @@
+import argparse
+import mmap
+import os
+import struct
+import wave
+
+import numpy as np
+
+from sound_bank import SAMPLE_DTYPES, SOUNDS_DIR, float_to_pcm, parse_sound_filename, pcm_to_float
+
+# --- Packed Bank Format ---
+# A packed bank is a single file:
+#   header  magic, entry count
+#   index   one fixed-width entry per (key, variant): offset and length of its
+#           PCM data in the file, and its sample format
+#   data    raw PCM, each sound aligned for zero-copy NumPy views
+# Sounds are stored as float32 by default, the format the mixer works in.
+MAGIC = b"KEYBANK1"
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<32sHQQcxHI") # key, variant, offset, length, dtype code, channels, rate
+MAX_KEY_BYTES = 32
+DATA_ALIGN = 16
+PACKED_EXT = ".kbank"
+
+# Sample type codes stored in the index
+DTYPE_CODES = {b'h': np.int16, b'i': np.int32, b'f': np.float32}
+CODES_BY_WIDTH = {2: b'h', 4: b'i'}
+
+
+def _align(offset):
+    return (offset + DATA_ALIGN - 1) // DATA_ALIGN * DATA_ALIGN
+
+
+def read_sound_dir(sounds_dir):
+    """
+    Reads every `<key>.wav` and `<key>.<n>.wav` take in a recorder output
+    directory. Returns a list of (key, variant, dtype code, channels, rate,
+    PCM bytes) sorted by key and variant.
+    """
+    entries = []
+    takes = sorted((parsed, filename) for filename in os.listdir(sounds_dir)
+                   if (parsed := parse_sound_filename(filename)))
+    for (key, variant), filename in takes:
+        filepath = os.path.join(sounds_dir, filename)
+        try:
+            with wave.open(filepath, 'rb') as wf:
+                width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+                frames = wf.readframes(wf.getnframes())
+        except (wave.Error, EOFError) as e:
+            print(f"Warning: Could not read {filepath}, skipping. Error: {e}")
+            continue
+        if width not in SAMPLE_DTYPES:
+            print(f"Warning: {filepath} has unsupported sample width {width}, skipping.")
+            continue
+        entries.append((key, variant, CODES_BY_WIDTH[width], channels, rate, frames))
+    return entries
+
+
+def write_packed_bank(entries, output_path, as_float=True):
+    """
+    Writes (key, variant, dtype code, channels, rate, PCM bytes) entries to
+    a packed bank file. With `as_float`, integer PCM is converted to float32
+    so that loading needs no conversion at all.
+    """
+    payloads = []
+    # Readers expect each key's takes in variant order
+    for key, variant, code, channels, rate, frames in sorted(entries, key=lambda e: (e[0], e[1])):
+        key_bytes = key.encode("utf-8")
+        if len(key_bytes) > MAX_KEY_BYTES:
+            raise ValueError(f"Key name '{key}' is longer than {MAX_KEY_BYTES} bytes")
+        if as_float and code != b'f':
+            frames = pcm_to_float(frames, np.dtype(DTYPE_CODES[code]).itemsize, channels).tobytes()
+            code = b'f'
+        payloads.append((key_bytes, variant, code, channels, rate, frames))
+
+    # Lay out the data section after the header and index
+    offset = _align(HEADER.size + ENTRY.size * len(payloads))
+    index = []
+    for key_bytes, variant, code, channels, rate, frames in payloads:
+        index.append(ENTRY.pack(key_bytes, variant, offset, len(frames), code, channels, rate))
+        offset = _align(offset + len(frames))
+
+    with open(output_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(payloads)))
+        f.write(b''.join(index))
+        for entry, payload in zip(index, payloads):
+            f.seek(ENTRY.unpack(entry)[2])
+            f.write(payload[5])
+
+
+def pack_sound_dir(sounds_dir, output_path, as_float=True):
+    """Converts a recorder output directory into a single packed bank file."""
+    entries = read_sound_dir(sounds_dir)
+    write_packed_bank(entries, output_path, as_float=as_float)
+    return len(entries)
+
+
+class PackedBank:
+    """
+    A packed bank file opened with a single `mmap`.
+
+    Sounds are zero-copy `memoryview` slices of the mapping, and float32
+    entries are exposed to the mixer as NumPy views of the same memory, so
+    opening a bank costs one index parse regardless of how many sounds it
+    holds. It offers the same lookups as `SoundBank`, including `variants`
+    for keys with several takes. `get` returns PCM in `sample_width` like
+    `SoundBank.get`: 16-bit entries are served from the mapping, others are
+    converted the first time they are asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sample_width = 2 # Output PCM width
+        self.channels = None
+        self.rate = None
+        self.sounds = {}
+        self.samples = {}
+        self.variants = {}
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._load_index()
+
+    def _load_index(self):
+        magic, count = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a packed sound bank")
+
+        index = self._view[HEADER.size:HEADER.size + ENTRY.size * count]
+        for key_bytes, variant, offset, length, code, channels, rate in ENTRY.iter_unpack(index):
+            key = key_bytes.rstrip(b'\x00').decode("utf-8")
+            if self.rate is None:
+                self.channels, self.rate = channels, rate
+            elif (channels, rate) != (self.channels, self.rate):
+                print(f"Warning: Sound '{key}' has format {(channels, rate)}, "
+                      f"expected {(self.channels, self.rate)}. Skipping.")
+                continue
+
+            frames = self._view[offset:offset + length]
+            samples = np.frombuffer(frames, dtype=DTYPE_CODES[code])
+            if code != b'f':
+                # Integer entries need one conversion; float entries stay zero-copy
+                samples = samples.astype(np.float32) / float(np.iinfo(samples.dtype).max)
+            self.variants.setdefault(key, []).append(samples.reshape(-1, channels))
+            if key not in self.sounds:
+                # Converted by get() on first use unless stored in the output width
+                self.sounds[key] = frames if code == CODES_BY_WIDTH[self.sample_width] else None
+                self.samples[key] = self.variants[key][-1]
+
+    @property
+    def format(self):
+        """The (sample width, channels, rate) of the bank's output."""
+        return (self.sample_width, self.channels, self.rate)
+
+    def get(self, key):
+        """Returns the PCM frames for `key` in `sample_width`, or None if there is no sound for it."""
+        frames = self.sounds.get(key)
+        if frames is None and key in self.samples:
+            frames = self.sounds[key] = float_to_pcm(self.samples[key], self.sample_width)
+        return frames
+
+    def get_samples(self, key):
+        """Returns the float32 samples for `key`, or None if there is no sound for it."""
+        return self.samples.get(key)
+
+    def __contains__(self, key):
+        return key in self.sounds
+
+    def __len__(self):
+        return len(self.sounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack a keystroke sound directory into a single bank file.")
+    parser.add_argument("sounds_dir", nargs="?", default=SOUNDS_DIR, help="Directory of <key>.wav and <key>.<n>.wav files")
+    parser.add_argument("output", nargs="?", default=None, help=f"Output file (default: <sounds_dir>{PACKED_EXT})")
+    parser.add_argument("--keep-pcm", action="store_true", help="Store the original integer PCM instead of float32")
+    args = parser.parse_args()
+
+    output = args.output or args.sounds_dir.rstrip(os.sep) + PACKED_EXT
+    count = pack_sound_dir(args.sounds_dir, output, as_float=not args.keep_pcm)
+    print(f"Packed {count} sounds from {args.sounds_dir} into {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import csv
+import time
+import wave
+
+import numpy as np
+
+from keymap import char_to_key
+from onset import HOP_SIZE, detect_onset, onset_strength, onset_threshold, to_mono
+from sound_bank import RELEASE_SUFFIX, SOUNDS_DIR, load_bank, pcm_to_float
+
+# --- Recognizer Configuration ---
+FFT_SIZE = 512 # Samples per feature frame
+FEATURE_HOP = 256 # Samples between feature frames
+FEATURE_FRAMES = 6 # Frames per keystroke, ~40 ms at 44.1kHz from the onset
+N_MELS = 32 # Mel bands per frame
+MIN_GAP = 0.03 # Seconds; onsets closer than this to the previous one are the same keystroke
+BLOCK_SECONDS = 30.0 # Recording analysed at a time, so long files never have to fit in RAM
+MATCH_TOLERANCE = 0.02 # Seconds between a detected onset and a labeled one to count as the same key
+
+WINDOW = FFT_SIZE + (FEATURE_FRAMES - 1) * FEATURE_HOP # Samples of audio per keystroke
+
+
+def mel_filterbank(rate, fft_size=FFT_SIZE, n_mels=N_MELS):
+    """Triangular mel filters as an (n_mels, fft_size // 2 + 1) matrix."""
+    def to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    mels = np.linspace(to_mel(0.0), to_mel(rate / 2.0), n_mels + 2)
+    edges = 700.0 * (10.0 ** (mels / 2595.0) - 1.0)
+    freqs = np.fft.rfftfreq(fft_size, 1.0 / rate)
+    lower, centre, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (centre - lower)
+    falling = (upper - freqs) / (upper - centre)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def keystroke_features(windows, filterbank):
+    """
+    Feature vectors for a batch of keystroke windows of shape (n, WINDOW).
+
+    Every window is split into FEATURE_FRAMES frames and all frames of all
+    keystrokes go through one FFT and one mel matrix multiply. Each vector
+    is the log-mel frames flattened, centred and scaled to unit length, so
+    a dot product between two is their cosine similarity and loudness does
+    not matter.
+    """
+    frames = np.lib.stride_tricks.sliding_window_view(windows, FFT_SIZE, axis=1)[:, ::FEATURE_HOP]
+    frames = frames * np.hanning(FFT_SIZE).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, axis=2)) ** 2
+    features = np.log(power @ filterbank.T + 1e-10).reshape(len(windows), -1)
+    features -= features.mean(axis=1, keepdims=True)
+    features /= np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-10)
+    return features.astype(np.float32)
+
+
+def segment_keystrokes(signal, rate, min_gap=MIN_GAP):
+    """
+    Sample indices of every keystroke onset in a 1-D signal: frames where
+    the spectral flux rises above the adaptive threshold, at least
+    `min_gap` seconds after the previous onset.
+    """
+    strength = onset_strength(signal)
+    above = strength > onset_threshold(strength)
+    rising = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+    onsets = []
+    last = -np.inf
+    gap = min_gap * rate
+    for frame in rising.tolist():
+        position = frame * HOP_SIZE
+        if position - last >= gap:
+            onsets.append(position)
+            last = position
+    return np.array(onsets, dtype=np.int64)
+
+
+class KeystrokeIndex:
+    """
+    Feature matrix of every take in a sound bank, for nearest-neighbour matching.
+
+    Built once per bank; matching a batch of keystrokes is then a single
+    matrix multiply against it.
+    """
+
+    def __init__(self, features, labels, rate):
+        self.features = features
+        self.labels = np.asarray(labels)
+        self.rate = rate
+        self.filterbank = mel_filterbank(rate)
+
+    @classmethod
+    def from_bank(cls, bank):
+        """
+        Indexes every take of every key in `bank`, starting each at its
+        onset. Key-up takes are indexed too, so a release in a recording
+        matches one and can be told apart from a keystroke.
+        """
+        windows, labels = [], []
+        for key, takes in bank.variants.items():
+            for samples in takes:
+                signal = to_mono(samples)
+                start = detect_onset(signal) or 0
+                window = np.zeros(WINDOW, dtype=np.float32)
+                piece = signal[start:start + WINDOW]
+                window[:len(piece)] = piece
+                windows.append(window)
+                labels.append(key)
+        if not windows:
+            raise ValueError("Sound bank is empty, nothing to match against.")
+        features = keystroke_features(np.stack(windows), mel_filterbank(bank.rate))
+        return cls(features, labels, bank.rate)
+
+    def match(self, features):
+        """Returns the best-matching key for every feature row and its cosine similarity."""
+        scores = features @ self.features.T
+        best = scores.argmax(axis=1)
+        return self.labels[best], scores[np.arange(len(best)), best]
+
+
+def recognize_file(path, index, block_seconds=BLOCK_SECONDS):
+    """
+    Finds and identifies every keystroke in a WAV recording.
+
+    The file is read in blocks of `block_seconds`, each analysed with enough
+    of its neighbours to see onsets across the boundary and the full window
+    of a keystroke near its end. Sounds that best match a key-up take are
+    releases, not keystrokes, and are left out. Returns (onset times in
+    seconds, keys, similarity scores).
+    """
+    times, keys, scores = [], [], []
+    with wave.open(path, 'rb') as wf:
+        width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+        if rate != index.rate:
+            raise ValueError(f"Recording is {rate}Hz but the bank is {index.rate}Hz.")
+        block = int(block_seconds * rate)
+        pre = int(MIN_GAP * rate) + HOP_SIZE # Kept from the previous block
+        post = WINDOW # Needed past the block end to cut the last keystrokes
+        buffer = np.zeros(0, dtype=np.float32)
+        buffer_start = 0 # Absolute sample of buffer[0]
+        keep_from = 0    # Onsets before this buffer position were handled already
+
+        while True:
+            frames = wf.readframes(block)
+            final = len(frames) < block * width * channels
+            buffer = np.concatenate([buffer, to_mono(pcm_to_float(frames, width, channels))])
+            keep_to = len(buffer) if final else max(keep_from, len(buffer) - post)
+
+            onsets = segment_keystrokes(buffer, rate)
+            onsets = onsets[(onsets >= keep_from) & (onsets < keep_to)]
+            if len(onsets):
+                padded = np.pad(buffer, (0, WINDOW))
+                windows = padded[onsets[:, None] + np.arange(WINDOW)]
+                matched, similarity = index.match(keystroke_features(windows, index.filterbank))
+                pressed = ~np.char.endswith(matched, RELEASE_SUFFIX)
+                times.append((buffer_start + onsets[pressed]) / rate)
+                keys.append(matched[pressed])
+                scores.append(similarity[pressed])
+
+            if final:
+                break
+            cut = max(0, keep_to - pre)
+            buffer = buffer[cut:]
+            buffer_start += cut
+            keep_from = keep_to - cut
+
+    if not times:
+        return np.zeros(0), np.zeros(0, dtype=str), np.zeros(0, dtype=np.float32)
+    return np.concatenate(times), np.concatenate(keys), np.concatenate(scores)
+
+
+def read_labels(path):
+    """
+    Reads the true keystrokes from a CSV with `key` and `onset` (seconds)
+    columns, such as the sidecar written by render.py. Characters are
+    mapped to the bank key that types them.
+    """
+    onsets, keys = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            typed = char_to_key(row['key'])
+            keys.append(typed[0] if typed else row['key'].lower())
+            onsets.append(float(row['onset']))
+    return np.array(onsets), np.array(keys)
+
+
+def confusion(true_times, true_keys, times, keys, tolerance=MATCH_TOLERANCE):
+    """
+    Pairs every labeled keystroke with the nearest detected one within
+    `tolerance` seconds and counts how each key was recognised.
+
+    Returns (key names, confusion matrix). Row i is the true key, column j
+    the recognised one, and the extra last column counts missed keystrokes.
+    """
+    names = sorted(set(true_keys.tolist()) | set(keys.tolist()))
+    ids = {name: i for i, name in enumerate(names)}
+    matrix = np.zeros((len(names), len(names) + 1), dtype=np.int64)
+    true_ids = np.array([ids[key] for key in true_keys.tolist()], dtype=np.int64)
+
+    predicted = np.full(len(true_times), len(names)) # Missed unless a detection is close enough
+    if len(times):
+        order = np.argsort(times)
+        times, keys = times[order], keys[order]
+        right = np.minimum(np.searchsorted(times, true_times), len(times) - 1)
+        left = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(times[left] - true_times) <= np.abs(times[right] - true_times), left, right)
+        close = np.abs(times[nearest] - true_times) <= tolerance
+        detected_ids = np.array([ids[key] for key in keys.tolist()], dtype=np.int64)
+        predicted[close] = detected_ids[nearest[close]]
+    np.add.at(matrix, (true_ids, predicted), 1)
+    return names, matrix
+
+
+def format_confusion(names, matrix):
+    """Overall and per-key accuracy, with each key's most common mistake."""
+    totals = matrix.sum(axis=1)
+    correct = matrix[np.arange(len(names)), np.arange(len(names))]
+    lines = [f"Accuracy: {correct.sum()}/{totals.sum()} ({100.0 * correct.sum() / max(1, totals.sum()):.1f}%), "
+             f"missed {matrix[:, -1].sum()}"]
+    for i, name in enumerate(names):
+        if not totals[i]:
+            continue
+        errors = matrix[i, :-1].copy()
+        errors[i] = 0
+        line = f"  {name!r:>12}: {correct[i]}/{totals[i]} ({100.0 * correct[i] / totals[i]:.1f}%)"
+        if errors.any():
+            line += f", most often heard as {names[errors.argmax()]!r}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify the keys typed in a recording of real typing.")
+    parser.add_argument("recording", help="WAV recording of typing")
+    parser.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank directory or packed bank file")
+    parser.add_argument("--labels", default=None,
+                        help="CSV of the keys actually typed (key, onset), to report accuracy")
+    parser.add_argument("--output", default=None, help="CSV to write the recognised keys to")
+    args = parser.parse_args()
+
+    with wave.open(args.recording, 'rb') as wf:
+        rate = wf.getframerate()
+    # Match at the recording's rate, in mono
+    bank = load_bank(args.sounds_dir, (2, 1, rate))
+
+    start = time.perf_counter()
+    index = KeystrokeIndex.from_bank(bank)
+    times, keys, scores = recognize_file(args.recording, index)
+    elapsed = time.perf_counter() - start
+    print(f"Found {len(times)} keystrokes in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["onset", "key", "score"])
+            for onset, key, score in zip(times.tolist(), keys.tolist(), scores.tolist()):
+                writer.writerow([f"{onset:.6f}", key, f"{score:.3f}"])
+    else:
+        print("".join(key if len(key) == 1 else f"<{key}>" for key in keys.tolist()))
+
+    if args.labels:
+        true_times, true_keys = read_labels(args.labels)
+        print(format_confusion(*confusion(true_times, true_keys, times, keys)))
+
+
+if __name__ == "__main__":
+    main()
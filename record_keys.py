@@ -1,4 +1,4 @@
-import pyaudio
+import argparse
 import wave
 import os
 import time
@@ -9,16 +9,23 @@ import sys
 import tty
 import termios
 
+from capture import ContinuousCapture
+from onset import trim_keystroke
+from sound_bank import sound_filename
+
 # --- Audio Configuration ---
-FORMAT = pyaudio.paInt16  # 16-bit resolution
+SAMPLE_WIDTH = 2          # 16-bit resolution, as captured by ContinuousCapture
 CHANNELS = 1              # Mono
 RATE = 44100              # 44.1kHz sampling rate
 CHUNK = 1024              # Samples per buffer
-RECORD_SECONDS = 0.4      # Duration of recording after key press
+PRE_ROLL_SECONDS = 0.15   # Audio kept from before the key press reached us
+POST_ROLL_SECONDS = 0.4   # Audio searched after the key press
+MAX_SAMPLE_SECONDS = 0.3  # Longest keystroke sample to save
 OUTPUT_DIR = "keystroke_sounds" # Directory to save the recordings
 
 # --- Keys to Record ---
 KEYS_TO_RECORD = "abcdefghijklmnopqrstuvwxyz"
+TAKES_PER_KEY = 3 # Takes per key, so repeated letters can vary at playback
 
 def get_single_char():
     """
@@ -40,22 +47,26 @@ def get_single_char():
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
     return ch
 
-def record_audio_chunk(p, stream, seconds):
-    """Records a short audio chunk from the stream."""
-    frames = []
-    num_chunks = int(RATE / CHUNK * seconds)
-    # Give a tiny moment for the key sound to start before recording
-    time.sleep(0.05) 
-    for _ in range(num_chunks):
-        data = stream.read(CHUNK, exception_on_overflow=False)
-        frames.append(data)
-    return b''.join(frames)
-
-def save_wave_file(filepath, frames, p):
+def extract_keystroke(capture, key_frame):
+    """
+    Cuts the keystroke sound around `key_frame` out of the continuous capture.
+    The window starts before the key press, since the sound begins before the
+    terminal delivers the character, and is trimmed to the detected onset.
+    Returns the PCM frames, or None if no keystroke sound was found.
+    """
+    start = max(0, key_frame - int(PRE_ROLL_SECONDS * RATE))
+    end = key_frame + int(POST_ROLL_SECONDS * RATE)
+    window = capture.window(start, end)
+    samples = trim_keystroke(window, RATE, max_seconds=MAX_SAMPLE_SECONDS)
+    if samples is None:
+        return None
+    return samples.tobytes()
+
+def save_wave_file(filepath, frames):
     """Saves the recorded frames to a WAV file."""
     with wave.open(filepath, 'wb') as wf:
         wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
+        wf.setsampwidth(SAMPLE_WIDTH)
         wf.setframerate(RATE)
         wf.writeframes(frames)
 
@@ -63,35 +74,43 @@ def main():
     """
     Main function to orchestrate the recording of each keystroke.
     """
+    argparse.ArgumentParser(description="Record the sound of each letter key, prompted one key at a time.").parse_args()
+
     # Create the output directory if it doesn't exist
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"Created directory: {OUTPUT_DIR}")
 
+    # Imported here so --help works without the audio library
+    import pyaudio
+
     p = pyaudio.PyAudio()
 
-    # Open a persistent audio stream
-    stream = p.open(format=FORMAT,
-                    channels=CHANNELS,
-                    rate=RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK)
+    # Capture continuously in the background, so the microphone keeps
+    # recording while we wait on the terminal for the next key
+    capture = ContinuousCapture(RATE, CHANNELS, CHUNK, audio=p)
+    capture.start()
 
     print("--- Keystroke Sound Recorder ---")
-    print("This script will record the sound of each letter key you press.")
+    print(f"This script will record the sound of each letter key you press, {TAKES_PER_KEY} times.")
     print("For each letter, press the key firmly when prompted.")
     print("Ensure you are in a quiet environment for the best results.\n")
     print("Press Ctrl+C at any time to quit.")
     time.sleep(2)
 
     try:
-        for char_to_record in KEYS_TO_RECORD:
+        # Takes leave the list once their sound is saved, so a miss is retried
+        pending_takes = [(char, take) for char in KEYS_TO_RECORD for take in range(TAKES_PER_KEY)]
+        while pending_takes:
+            char_to_record, take = pending_takes[0]
             # Using flush=True ensures the prompt appears immediately
-            print(f"[*] Please press the '{char_to_record.upper()}' key now...", end="", flush=True)
+            print(f"[*] Please press the '{char_to_record.upper()}' key now "
+                  f"(take {take + 1}/{TAKES_PER_KEY})...", end="", flush=True)
             
             # Wait for the correct key to be pressed
             while True:
                 pressed_key = get_single_char()
+                key_frame = capture.current_frame()
                 
                 # Check for Ctrl+C to exit gracefully
                 if ord(pressed_key) == 3: 
@@ -106,14 +125,18 @@ def main():
                     # '\r' moves the cursor to the beginning of the line to overwrite it
                     print(f"\r[!] Wrong key. Please press '{char_to_record.upper()}'.", end="", flush=True)
 
-            # The correct key was pressed, now record the audio
-            frames = record_audio_chunk(p, stream, RECORD_SECONDS)
+            # The correct key was pressed, now cut its sound from the capture
+            frames = extract_keystroke(capture, key_frame)
+            if frames is None:
+                print("  -> No keystroke sound detected. Let's try that key again.\n")
+                continue
             
             # Save the recorded audio
-            filename = f"{char_to_record}.wav"
+            filename = sound_filename(char_to_record, take)
             filepath = os.path.join(OUTPUT_DIR, filename)
-            save_wave_file(filepath, frames, p)
+            save_wave_file(filepath, frames)
             print(f"  -> Saved sound to {filepath}\n")
+            pending_takes.pop(0)
             
             # A small delay to prepare for the next key
             time.sleep(0.5)
@@ -125,9 +148,8 @@ def main():
     finally:
         print("--- Cleaning up and closing audio stream. ---")
         # Cleanup
-        if 'stream' in locals() and stream.is_active():
-            stream.stop_stream()
-            stream.close()
+        if 'capture' in locals():
+            capture.close()
         if 'p' in locals():
             p.terminate()
 
@@ -1,109 +1,174 @@
+import argparse
+import csv
 import os
+import queue
 import threading
 import time
 import wave
-import pyaudio
-from pynput import keyboard
+
+from capture import ContinuousCapture
+from key_log import KeyLogWriter, normalize_key
+from onset import trim_keystroke
+from sound_bank import parse_sound_filename, release_sound, sound_filename
 
 # --- Configuration ---
 OUTPUT_DIR = "my_keyboard_sounds"  # Directory to save the recordings
-RECORD_SECONDS = 0.2  # Duration of each key press recording in seconds
-IS_RECORDING = False  # Global flag to prevent overlapping recordings
+PRE_ROLL_SECONDS = 0.05  # Audio kept from before the key press event
+POST_ROLL_SECONDS = 0.3  # Audio searched after the key press event
+MAX_SAMPLE_SECONDS = 0.2  # Longest keystroke sample to save
+MIN_PRESS_SECONDS = 0.03  # Audio always kept after the key press event, however short the hold
+BUFFER_SECONDS = 30  # Audio history; extraction may lag capture by up to this much
+QUEUE_SIZE = 256  # Key presses waiting for extraction
+KEY_LOG_FILE = "key_log.csv"  # Press/release timestamps of the session
+KEY_LOG_BIN_FILE = "session.keylog"  # The same events as a compact binary log, for replay
 
 # --- Audio Settings ---
-FORMAT = pyaudio.paInt16  # Audio format
 CHANNELS = 1  # Mono audio
 RATE = 44100  # Sample rate
 CHUNK = 1024  # Buffer size
+SAMPLE_WIDTH = 2  # 16-bit audio
 
 # --- Key Press Management ---
-# This set will keep track of keys that are currently held down
+# Keys currently held down and the capture frame they went down at,
 # to prevent continuous recording if a key is held.
-pressed_keys = set()
+pressed_keys = {}
+
+# Every press and release as (key name, 'press'/'release', capture frame, monotonic ns)
+key_events = []
+
+# Binary log of the same events, opened in main()
+key_log = None
+
+# Released keys waiting for their press and release samples to be cut from the capture
+extract_queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+# Releases dropped because the queue was full; the listener never waits on it
+dropped_takes = 0
+
+# The single input stream, opened in main()
+capture = None
+
+# Number of takes saved so far per key, so new takes never overwrite old ones
+take_counts = {}
 
 # --- Special Key Mapping ---
-# Maps pynput's special keys to the filenames we want.
+# Maps the names of pynput's special keys to the filenames we want.
 # This ensures compatibility with the injector script's key_code_map.
 SPECIAL_KEY_MAP = {
-    keyboard.Key.space: ' ',
-    keyboard.Key.enter: 'return',
-    keyboard.Key.backspace: 'backspace',
-    keyboard.Key.esc: 'escape',
-    keyboard.Key.cmd: 'command',
-    keyboard.Key.shift: 'shift',
-    keyboard.Key.alt: 'option', # 'alt' is Option on Mac
-    keyboard.Key.ctrl: 'control',
+    'space': ' ',
+    'enter': 'return',
+    'backspace': 'backspace',
+    'esc': 'escape',
+    'cmd': 'command',
+    'shift': 'shift',
+    'alt': 'option', # 'alt' is Option on Mac
+    'ctrl': 'control',
 }
 
-def record_audio(filename_base):
-    """Records a short audio clip and saves it to a WAV file."""
-    global IS_RECORDING
-    if IS_RECORDING:
-        return # Don't start a new recording if one is already in progress
-
-    IS_RECORDING = True
-    
-    filepath = os.path.join(OUTPUT_DIR, f"{filename_base}.wav")
-    
-    # Skip if the file already exists
-    if os.path.exists(filepath):
-        print(f"Sound for '{filename_base}' already exists. Skipping.")
-        IS_RECORDING = False
-        return
-
-    print(f"Recording sound for '{filename_base}'...")
-
-    audio = pyaudio.PyAudio()
-    
-    # Start Recording
-    stream = audio.open(format=FORMAT, channels=CHANNELS,
-                        rate=RATE, input=True,
-                        frames_per_buffer=CHUNK)
-    frames = []
-    
-    for _ in range(0, int(RATE / CHUNK * RECORD_SECONDS)):
-        data = stream.read(CHUNK)
-        frames.append(data)
-    
-    # Stop Recording
-    stream.stop_stream()
-    stream.close()
-    audio.terminate()
-    
-    # Save the recording to a WAV file
+def count_existing_takes():
+    """Counts the takes already in the output directory for every key."""
+    for filename in os.listdir(OUTPUT_DIR):
+        parsed = parse_sound_filename(filename)
+        if parsed:
+            key_name, variant = parsed
+            take_counts[key_name] = max(take_counts.get(key_name, 0), variant + 1)
+
+def save_take(key_name, frames):
+    """Saves a keystroke sample as the next take for `key_name`."""
+    take = take_counts.get(key_name, 0)
+    take_counts[key_name] = take + 1
+    filepath = os.path.join(OUTPUT_DIR, sound_filename(key_name, take))
     with wave.open(filepath, 'wb') as wf:
         wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio.get_sample_size(FORMAT))
+        wf.setsampwidth(SAMPLE_WIDTH)
         wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-    
-    print(f" ✓ Saved {filepath}")
-    
-    # A small delay to ensure the microphone "settles" and avoids echo/feedback
-    # if the user types extremely fast.
-    time.sleep(0.1) 
-    IS_RECORDING = False
+        wf.writeframes(frames)
+    return filepath
+
+def extract_take(sound_name, start, end):
+    """Cuts the keystroke in capture frames [start, end) and saves it as a take of `sound_name`."""
+    try:
+        window = capture.window(start, end)
+    except ValueError:
+        print(f" ✗ Extraction fell more than {BUFFER_SECONDS}s behind, lost take for '{sound_name}'")
+        return False
+
+    samples = trim_keystroke(window, RATE, max_seconds=MAX_SAMPLE_SECONDS)
+    if samples is None:
+        print(f" ✗ No keystroke sound found for '{sound_name}'")
+        return False
+    filepath = save_take(sound_name, samples.tobytes())
+    print(f" ✓ Saved {filepath} ({extract_queue.qsize()} queued)")
+    return True
+
+def extract_worker():
+    """
+    Cuts each released key's press and release transients out of the
+    capture and saves them as separate takes: `<key>` and `<key>.up`.
+    The two windows meet at the release event, so neither sample contains
+    the other; the press window always reaches at least MIN_PRESS_SECONDS
+    past the press, since events are only as precise as a capture chunk.
+    Runs on its own thread so the key listener never waits on audio work.
+    """
+    pre_roll = int(PRE_ROLL_SECONDS * RATE)
+    post_roll = int(POST_ROLL_SECONDS * RATE)
+    min_press = int(MIN_PRESS_SECONDS * RATE)
+    max_lag = 0.0
+    while True:
+        item = extract_queue.get()
+        if item is None:
+            break
+        key_name, press_frame, release_frame = item
+
+        split = max(release_frame, press_frame + min_press)
+        end = split + post_roll
+        # A take that fails to save is reported and skipped; the worker must
+        # keep draining the queue or the listener would back up behind it
+        takes = ((key_name, max(0, press_frame - pre_roll), min(press_frame + post_roll, split)),
+                 (release_sound(key_name), split, end))
+        for sound_name, start, stop in takes:
+            try:
+                extract_take(sound_name, start, stop)
+            except Exception as e:
+                print(f" ✗ Failed to save take for '{sound_name}': {e}")
+
+        # How far this key's audio is behind what the microphone is capturing now
+        lag = (capture.current_frame() - end) / RATE
+        max_lag = max(max_lag, lag)
+
+    print(f"Extraction finished. Maximum lag behind capture: {max_lag:.2f}s")
+
+def save_key_log(filepath):
+    """Writes every press and release timestamp of the session to a CSV file."""
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "event", "frame", "time_ns"])
+        writer.writerows(key_events)
 
 def get_key_name(key):
-    """Translates a pynput key object into a consistent string name."""
-    if key in SPECIAL_KEY_MAP:
-        return SPECIAL_KEY_MAP[key]
+    """
+    Translates a pynput key object into a consistent string name. Shifted
+    characters are named after the key that types them, so 'A' and 'a'
+    share one set of takes.
+    """
     try:
         # For regular alphanumeric keys
-        return key.char
+        name = key.char
     except AttributeError:
-        # For other special keys not in our map (e.g., F1, Home)
-        return key.name
+        # For special keys, mapped or not (e.g., F1, Home)
+        name = SPECIAL_KEY_MAP.get(key.name, key.name)
+    return normalize_key(name) if name is not None else None
 
 def on_press(key):
     """Callback function executed when a key is pressed."""
+    key_frame = capture.current_frame()
     key_name = get_key_name(key)
     
     if key_name is None:
         return
         
     # Stop the listener if Escape is pressed
-    if key == keyboard.Key.esc:
+    if key_name == 'escape':
         print("Escape pressed, stopping recorder...")
         return False # This stops the listener
 
@@ -111,37 +176,64 @@ def on_press(key):
     if key_name in pressed_keys:
         return
 
-    # Add the key to the set of pressed keys and start recording in a new thread
-    pressed_keys.add(key_name)
-    
-    # Use a thread to record audio so it doesn't block the main key listener
-    thread = threading.Thread(target=record_audio, args=(key_name,))
-    thread.start()
+    # Remember when it went down; it is extracted once it is released
+    pressed_keys[key_name] = key_frame
+    time_ns = time.monotonic_ns()
+    key_events.append((key_name, 'press', key_frame, time_ns))
+    key_log.append(key_name, True, time_ns)
 
 def on_release(key):
     """Callback function executed when a key is released."""
+    global dropped_takes
+    key_frame = capture.current_frame()
     key_name = get_key_name(key)
     if key_name in pressed_keys:
-        pressed_keys.remove(key_name)
+        press_frame = pressed_keys.pop(key_name)
+        time_ns = time.monotonic_ns()
+        key_events.append((key_name, 'release', key_frame, time_ns))
+        key_log.append(key_name, False, time_ns)
+        try:
+            extract_queue.put_nowait((key_name, press_frame, key_frame))
+        except queue.Full:
+            dropped_takes += 1
 
 def main():
     """Main function to set up and run the recorder."""
+    global capture, key_log
+    argparse.ArgumentParser(description="Record keystroke sounds and a key log while you type freely.").parse_args()
+
+    # Imported here so --help works without an input listener
+    from pynput import keyboard
+
     # Create the output directory if it doesn't exist
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"Created directory: {OUTPUT_DIR}")
+    count_existing_takes()
         
     print("--- Keystroke Sound Recorder ---")
-    print(f"Recording duration per key: {RECORD_SECONDS}s")
     print(f"Output directory: {OUTPUT_DIR}")
-    print("\nPress any key to record its sound.")
-    print("Recordings for existing keys will be skipped.")
+    print("\nType freely; every key press and release is saved as a new take.")
     print("\n>>> PRESS 'Esc' KEY TO STOP THE RECORDER. <<<\n")
 
-    # Set up and start the listener
-    with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
-        listener.join()
-        
+    # One input stream for the whole session, extraction on a worker thread
+    capture = ContinuousCapture(RATE, CHANNELS, CHUNK, seconds=BUFFER_SECONDS)
+    key_log = KeyLogWriter(os.path.join(OUTPUT_DIR, KEY_LOG_BIN_FILE))
+    worker = threading.Thread(target=extract_worker)
+    with capture, key_log:
+        worker.start()
+
+        # Set up and start the listener
+        with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
+            listener.join()
+
+        # Let the worker finish every queued take before closing the stream
+        extract_queue.put(None)
+        worker.join()
+
+    save_key_log(os.path.join(OUTPUT_DIR, KEY_LOG_FILE))
+    if dropped_takes:
+        print(f"Warning: {dropped_takes} key presses were not saved because extraction fell {QUEUE_SIZE} keys behind.")
     print("\nRecorder stopped. Your sounds are saved.")
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+import argparse
+import csv
+import os
+import time
+import wave
+
+import numpy as np
+
+from keymap import CHARS_BY_KEY, KEY_NAMES
+from keystroke_plan import compile_plan, plan_events, read_chunks, stream_plans
+from sound_bank import SOUNDS_DIR, VariantSelector, float_to_pcm, load_bank, release_sound
+from timing_model import TimingModel
+
+# --- Render Configuration ---
+BLOCK_SECONDS = 1.0 # Audio mixed and written at a time by the streaming renderer
+
+
+def write_wave_file(filepath, samples, sample_width, rate):
+    """Saves float samples of shape (n_frames, channels) to a WAV file."""
+    with wave.open(filepath, 'wb') as wf:
+        wf.setnchannels(samples.shape[1])
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(float_to_pcm(samples, sample_width))
+
+
+def write_key_timestamps(filepath, chars, onsets, offsets):
+    """Writes the sidecar CSV with the start and end time of every keystroke."""
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["index", "key", "onset", "offset"])
+        for i, char in enumerate(chars):
+            writer.writerow([i, char, f"{onsets[i]:.6f}", f"{offsets[i]:.6f}"])
+
+
+def event_sounds(plan, events):
+    """The bank sound of each event of a plan: the key's sound on a key down, its release sound on a key up."""
+    keys = [KEY_NAMES[sound_id] for sound_id in plan['sound_id'].tolist()]
+    return [keys[i] if down else release_sound(keys[i])
+            for i, down in zip(events['index'].tolist(), events['down'].tolist())]
+
+
+def render_to_wav(text, output_path, bank=None, seed=None, model=None):
+    """
+    Renders the audio of typing `text` into one WAV file, without an audio
+    device or keystroke injection.
+
+    The text is compiled into the same keystroke plan that is typed live,
+    and every key down and key up of it plays its own sound. A CSV of
+    per-key timestamps is written next to the WAV. Returns the path of that
+    CSV. `model` is an optional fitted TimingModel.
+    """
+    if bank is None:
+        bank = load_bank(SOUNDS_DIR)
+    if not len(bank):
+        raise ValueError("Sound bank is empty, nothing to render.")
+
+    plan = compile_plan(text, seed=seed, model=model)
+    events = plan_events(plan)
+    start_frames = np.round(events['offset'] * bank.rate).astype(np.int64)
+
+    # Every event's take, with no sound for keys missing from the bank
+    selector = VariantSelector(bank, seed=seed)
+    chosen = [selector.next(name) for name in event_sounds(plan, events)]
+    lengths = np.array([0 if samples is None else len(samples) for samples in chosen], dtype=np.int64)
+
+    total_frames = int((start_frames + lengths).max()) if len(events) else 0
+    track = np.zeros((total_frames, bank.channels), dtype=np.float32)
+
+    # Each add is a contiguous NumPy slice add, which is memory-bound and
+    # much faster than scattering all events through one fancy index
+    for start, samples in zip(start_frames, chosen):
+        if samples is not None:
+            track[start:start + len(samples)] += samples
+
+    # A keystroke runs from its key down to the end of its press sound
+    downs = events['down']
+    onsets = np.zeros(len(plan), dtype=np.int64)
+    onsets[events['index'][downs]] = start_frames[downs]
+    ends = np.zeros(len(plan), dtype=np.int64)
+    ends[events['index'][downs]] = start_frames[downs] + lengths[downs]
+    chars = [CHARS_BY_KEY[key] for key in zip(plan['key_code'].tolist(), plan['flags'].tolist())]
+
+    write_wave_file(output_path, track, bank.sample_width, bank.rate)
+    timestamps_path = os.path.splitext(output_path)[0] + ".keys.csv"
+    write_key_timestamps(timestamps_path, chars, onsets / bank.rate, ends / bank.rate)
+    return timestamps_path
+
+
+def render_stream(source, output_path, bank=None, seed=None, model=None, block_seconds=BLOCK_SECONDS):
+    """
+    Renders text from `source` (a path, file object or iterator of strings,
+    see `keystroke_plan.read_chunks`) to a WAV file in fixed-size blocks.
+
+    Key downs and key ups are overlap-added into a block buffer followed by
+    room for the longest sound; when the timeline moves past a block it is
+    written out and the sound tails spilling over are moved to the front.
+    Peak memory depends only on the block size and the bank, not on text
+    length. The text and the key timestamps CSV are streamed the same way.
+    """
+    if bank is None:
+        bank = load_bank(SOUNDS_DIR)
+    if not len(bank):
+        raise ValueError("Sound bank is empty, nothing to render.")
+
+    selector = VariantSelector(bank, seed=seed)
+    tail = max(len(samples) for takes in bank.variants.values() for samples in takes)
+    block = max(int(block_seconds * bank.rate), tail)
+    buffer = np.zeros((block + tail, bank.channels), dtype=np.float32)
+    block_start = 0 # Absolute frame of buffer[0]
+    end_frame = 0   # Absolute frame where the last sound so far ends
+
+    timestamps_path = os.path.splitext(output_path)[0] + ".keys.csv"
+    with wave.open(output_path, 'wb') as wf, open(timestamps_path, 'w', newline='') as f:
+        wf.setnchannels(bank.channels)
+        wf.setsampwidth(bank.sample_width)
+        wf.setframerate(bank.rate)
+        writer = csv.writer(f)
+        writer.writerow(["index", "key", "onset", "offset"])
+
+        def add_event(offset, sound, char):
+            nonlocal block_start, end_frame, index
+            start = int(round(offset * bank.rate))
+            # Write out every block the timeline has moved past
+            while start >= block_start + block:
+                wf.writeframes(float_to_pcm(buffer[:block], bank.sample_width))
+                buffer[:tail] = buffer[block:]
+                buffer[tail:] = 0.0
+                block_start += block
+
+            samples = selector.next(sound)
+            length = 0 if samples is None else len(samples)
+            if length:
+                position = start - block_start
+                buffer[position:position + length] += samples
+            end_frame = max(end_frame, start + length)
+
+            if char is not None:
+                writer.writerow([index, char, f"{start / bank.rate:.6f}", f"{(start + length) / bank.rate:.6f}"])
+                index += 1
+
+        index = 0
+        # Key ups later than a chunk's last key down wait for the next chunk,
+        # whose key downs may come before them
+        pending = []
+        for plan in stream_plans(read_chunks(source), model=model, seed=seed):
+            events = plan_events(plan)
+            chars = [CHARS_BY_KEY[key] for key in zip(plan['key_code'].tolist(), plan['flags'].tolist())]
+            batch = pending + [(offset, down, sound, chars[i] if down else None)
+                               for offset, i, down, sound in zip(events['offset'].tolist(), events['index'].tolist(),
+                                                                 events['down'].tolist(), event_sounds(plan, events))]
+            batch.sort(key=lambda event: (event[0], event[1]))
+            last_press = plan['offset'][-1]
+            pending = [event for event in batch if event[0] > last_press]
+            for offset, _, sound, char in batch[:len(batch) - len(pending)]:
+                add_event(offset, sound, char)
+        for offset, _, sound, char in pending:
+            add_event(offset, sound, char)
+
+        wf.writeframes(float_to_pcm(buffer[:end_frame - block_start], bank.sample_width))
+    return timestamps_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the sound of typing a text to a WAV file.")
+    parser.add_argument("output", help="Path of the WAV file to write")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--text", help="Text to type")
+    source.add_argument("--text-file", help="File containing the text to type")
+    parser.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank directory or packed bank file")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible timing")
+    parser.add_argument("--timing-model", default=None, help="Timing model fitted by timing_model.py")
+    parser.add_argument("--stream", action="store_true",
+                        help="Render in fixed-size blocks with bounded memory, for very long texts")
+    args = parser.parse_args()
+
+    model = TimingModel.load(args.timing_model) if args.timing_model else None
+    bank = load_bank(args.sounds_dir)
+
+    start = time.perf_counter()
+    if args.stream:
+        source = args.text_file if args.text_file else iter([args.text])
+        timestamps_path = render_stream(source, args.output, bank, seed=args.seed, model=model)
+    else:
+        if args.text_file:
+            with open(args.text_file, encoding="utf-8") as f:
+                text = f.read()
+        else:
+            text = args.text
+        timestamps_path = render_to_wav(text, args.output, bank, seed=args.seed, model=model)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {args.output} in {elapsed:.2f}s")
+    print(f"Key timestamps saved to {timestamps_path}")
+
+
+if __name__ == "__main__":
+    main()
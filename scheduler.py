@@ -0,0 +1,84 @@
+import time
+
+import numpy as np
+
+from telemetry import DEADLINE, SCHEDULED
+
+# --- Scheduler Configuration ---
+SPIN_SECONDS = 0.002 # Busy-wait this close to a deadline instead of sleeping
+
+
+def wait_until(deadline, spin=SPIN_SECONDS):
+    """
+    Waits until `time.perf_counter()` reaches `deadline`: a coarse sleep
+    for most of the wait, then a short spin to hit it precisely.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin:
+        time.sleep(remaining - spin)
+    while time.perf_counter() < deadline:
+        pass
+
+
+def lateness_summary(lateness):
+    """Summarizes per-event lateness (seconds) as milliseconds: mean, p50, p95, p99, max."""
+    if not len(lateness):
+        return {"count": 0}
+    ms = np.asarray(lateness) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+class DeadlineScheduler:
+    """
+    Runs one action per event at absolute deadlines fixed before the first
+    event starts.
+
+    Every deadline is the start time plus the event's offset, so time spent
+    injecting a key or starting its sound is absorbed instead of adding to
+    the next interval, and error never accumulates over a long text.
+    """
+
+    def __init__(self, offsets, spin=SPIN_SECONDS):
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        self.spin = spin
+        self.lateness = np.zeros(len(self.offsets)) # Preallocated, filled as events run
+        self.start_time = None
+
+    def run(self, action, start_time=None, telemetry=None):
+        """
+        Calls `action(i)` for every event `i` at its deadline and returns the
+        lateness summary. Events already past their deadline run immediately.
+        With a `Telemetry`, each event's deadline and actual start are marked.
+        """
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        deadlines = self.start_time + self.offsets
+        for i, deadline in enumerate(deadlines.tolist()):
+            wait_until(deadline, self.spin)
+            now = time.perf_counter()
+            self.lateness[i] = now - deadline
+            if telemetry is not None:
+                telemetry.mark(i, DEADLINE, deadline)
+                telemetry.mark(i, SCHEDULED, now)
+            action(i)
+        return self.summary()
+
+    def summary(self):
+        """Lateness statistics of the events run so far."""
+        return lateness_summary(self.lateness)
+
+
+def format_summary(summary):
+    """One-line, human-readable form of a lateness summary."""
+    if not summary.get("count"):
+        return "no events"
+    return (f"{summary['count']} events, lateness mean {summary['mean_ms']:.3f} ms, "
+            f"p50 {summary['p50_ms']:.3f} ms, p95 {summary['p95_ms']:.3f} ms, "
+            f"p99 {summary['p99_ms']:.3f} ms, max {summary['max_ms']:.3f} ms")
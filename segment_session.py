@@ -0,0 +1,173 @@
+import argparse
+import csv
+import os
+import struct
+import wave
+
+import numpy as np
+
+from onset import FRAME_SIZE, HOP_SIZE, onset_strength, to_mono, trim_keystroke
+from sound_bank import SAMPLE_DTYPES, SOUNDS_DIR, float_to_pcm, parse_sound_filename, sound_filename
+
+# --- Segmentation Configuration ---
+BLOCK_SECONDS = 30.0 # Recording analysed at a time; it is memory-mapped, never loaded whole
+PRE_ROLL_SECONDS = 0.05 # Audio kept from before the aligned key press
+POST_ROLL_SECONDS = 0.3 # Audio searched after the aligned key press
+MAX_SAMPLE_SECONDS = 0.2 # Longest keystroke sample to save
+SMOOTH_SECONDS = 0.01 # Width of each logged press in the alignment, for timing jitter
+MIN_CONFIDENCE = 4.0 # Alignment peaks fewer standard deviations above the rest than this are suspect
+
+
+def open_wav(path):
+    """
+    Memory-maps the sample data of a PCM WAV file. Returns (samples of shape
+    (n_frames, channels), sample width, rate); nothing is read until used.
+    """
+    with wave.open(path, 'rb') as wf:
+        width, channels, rate, n_frames = wf.getsampwidth(), wf.getnchannels(), wf.getframerate(), wf.getnframes()
+    dtype = SAMPLE_DTYPES.get(width)
+    if dtype is None:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    # Walk the RIFF chunks to where the sample data starts
+    with open(path, 'rb') as f:
+        f.seek(12)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"No data chunk in {path}")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'data':
+                offset = f.tell()
+                break
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+    samples = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(n_frames, channels))
+    return samples, width, rate
+
+
+def to_float(pcm):
+    """Scales a block of PCM samples to float32 in [-1.0, 1.0]."""
+    return pcm.astype(np.float32) / float(np.iinfo(pcm.dtype).max)
+
+
+def read_presses(path):
+    """Reads the key presses from a key_log.csv as (key names, times in seconds from the first)."""
+    keys, times_ns = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['event'] == 'press' and row['key']:
+                keys.append(row['key'])
+                times_ns.append(int(row['time_ns']))
+    times_ns = np.array(times_ns, dtype=np.int64)
+    if len(times_ns):
+        times_ns -= times_ns[0]
+    return keys, times_ns / 1e9
+
+
+def onset_envelope(samples, rate, block_seconds=BLOCK_SECONDS):
+    """
+    Spectral-flux onset strength of a whole recording, one value per
+    HOP_SIZE samples, computed a block at a time. Each block is scaled by
+    its own median so slow changes in background noise don't matter.
+    """
+    block = int(block_seconds * rate) // HOP_SIZE * HOP_SIZE
+    envelope = []
+    for start in range(0, len(samples), block):
+        signal = to_mono(to_float(samples[start:start + block + FRAME_SIZE - HOP_SIZE]))
+        strength = onset_strength(signal)[:block // HOP_SIZE]
+        envelope.append(np.log1p(strength / max(float(np.median(strength)), 1e-6)))
+    return np.concatenate(envelope) if envelope else np.zeros(0)
+
+
+def align_presses(envelope, press_times, rate):
+    """
+    Finds the clock offset, in seconds, to add to the logged press times to
+    land them on the recording's onsets.
+
+    The presses become a train of short pulses on the envelope's grid and
+    every possible lag is scored at once by FFT cross-correlation. Returns
+    (offset, how many standard deviations the best score stands above the
+    rest) so weak alignments can be spotted.
+    """
+    step = HOP_SIZE / rate
+    positions = np.round(press_times / step).astype(np.int64)
+    width = max(1, int(SMOOTH_SECONDS / step))
+    train = np.zeros(positions[-1] + width + 1)
+    np.add.at(train, positions, 1.0)
+    train = np.convolve(train, np.hanning(2 * width + 1), mode='same')
+
+    size = 1 << (len(envelope) + len(train)).bit_length()
+    scores = np.fft.irfft(np.fft.rfft(envelope, size) * np.conj(np.fft.rfft(train, size)), size)
+    # Lags past the envelope's end wrap around to mean the log started first
+    lags = np.arange(size)
+    lags[lags >= size - len(train)] -= size
+    valid = (lags > -len(train)) & (lags < len(envelope))
+    scores, lags = scores[valid], lags[valid]
+
+    best = int(scores.argmax())
+    confidence = (scores[best] - scores.mean()) / max(float(scores.std()), 1e-9)
+    return lags[best] * step, confidence
+
+
+def segment_session(recording_path, log_path, output_dir=SOUNDS_DIR):
+    """
+    Cuts every logged key press out of a long recording of natural typing
+    into a multi-variant bank in `output_dir`, after the takes already
+    there. Returns (clock offset in seconds, alignment confidence, takes
+    saved, presses with no keystroke found).
+    """
+    samples, width, rate = open_wav(recording_path)
+    keys, press_times = read_presses(log_path)
+    if not keys:
+        raise ValueError(f"No key presses in {log_path}")
+
+    offset, confidence = align_presses(onset_envelope(samples, rate), press_times, rate)
+
+    os.makedirs(output_dir, exist_ok=True)
+    take_counts = {}
+    for filename in os.listdir(output_dir):
+        parsed = parse_sound_filename(filename)
+        if parsed:
+            take_counts[parsed[0]] = max(take_counts.get(parsed[0], 0), parsed[1] + 1)
+
+    pre, post = int(PRE_ROLL_SECONDS * rate), int(POST_ROLL_SECONDS * rate)
+    saved = missed = 0
+    for key, press_time in zip(keys, press_times.tolist()):
+        frame = int(round((press_time + offset) * rate))
+        start, end = max(0, frame - pre), min(len(samples), frame + post)
+        if end <= start:
+            missed += 1
+            continue
+        take = trim_keystroke(to_float(samples[start:end]), rate, max_seconds=MAX_SAMPLE_SECONDS)
+        if take is None:
+            missed += 1
+            continue
+
+        variant = take_counts.get(key, 0)
+        take_counts[key] = variant + 1
+        with wave.open(os.path.join(output_dir, sound_filename(key, variant)), 'wb') as wf:
+            wf.setnchannels(samples.shape[1])
+            wf.setsampwidth(width)
+            wf.setframerate(rate)
+            wf.writeframes(float_to_pcm(take, width))
+        saved += 1
+    return offset, confidence, saved, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a sound bank from a long recording of natural typing.")
+    parser.add_argument("recording", help="WAV recording of the typing session")
+    parser.add_argument("key_log", help="key_log.csv written by record_keys_old.py during the session")
+    parser.add_argument("-o", "--output-dir", default=SOUNDS_DIR, help="Sound bank directory to add takes to")
+    args = parser.parse_args()
+
+    offset, confidence, saved, missed = segment_session(args.recording, args.key_log, args.output_dir)
+    print(f"Key log aligned to the recording at {offset:+.3f}s (peak {confidence:.1f} sd above the rest)")
+    if confidence < MIN_CONFIDENCE:
+        print("Warning: The alignment is weak; check the log belongs to this recording.")
+    print(f"Saved {saved} takes to {args.output_dir}, no keystroke found for {missed} presses.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,140 @@
-import pyaudio
-import wave
+import argparse
 import os
 import time
-import random
-import threading
-from pynput.keyboard import Controller
 
-SOUNDS_DIR = "keystroke_sounds" # Must match the output dir from the recorder
+import numpy as np
 
-# Create a keyboard controller instance
-keyboard = Controller()
+from augment import AugmentedSelector
+from backends import PynputBackend, get_backend, key_event_runner
+from keymap import KEY_NAMES
+from keystroke_plan import compile_plan, plan_events
+from mixer import AudioOutput, Mixer, default_output_format
+from scheduler import DeadlineScheduler, format_summary
+from sound_bank import SOUNDS_DIR, VariantSelector, load_bank, release_sound
+from telemetry import Telemetry, format_telemetry
+from timing_model import TimingModel
 
-def play_wav_task(filepath):
+TIMING_MODEL_FILE = "timing_model.npz" # Written by timing_model.py, used if present
+DEFAULT_TEXT = "Hello world! This is a real typing simulation on macOS. Hope this works."
+
+def plan_event_runner(plan, events, mixer, backend, selector, telemetry=None):
     """
-    Plays a WAV file. This function is designed to be run in a separate thread
-    to avoid blocking the main typing simulation.
+    Returns a function that runs event `i` of a plan's `events` (see
+    `plan_events`): plays the key's sound on `mixer`, or its key-up sound
+    if the bank has one, and posts the key down or up to `backend`.
     """
-    try:
-        with wave.open(filepath, 'rb') as wf:
-            # Each thread needs its own PyAudio instance
-            p = pyaudio.PyAudio()
-            stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                            channels=wf.getnchannels(),
-                            rate=wf.getframerate(),
-                            output=True)
-            
-            data = wf.readframes(1024)
-            while data:
-                stream.write(data)
-                data = wf.readframes(1024)
-                
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
-    except FileNotFoundError:
-        # It's okay if some sounds are missing, we just won't play them.
-        pass
-    except Exception as e:
-        print(f"\n[Error playing sound {filepath}: {e}]")
+    down_sounds = [KEY_NAMES[sound_id] for sound_id in plan['sound_id'].tolist()]
+    up_sounds = [release_sound(key) for key in down_sounds]
 
+    def play(i, key, down):
+        #Play Sound (in background)
+        mixer.play(selector.next(down_sounds[key] if down else up_sounds[key]), i)
 
-def simulate_typing(text):
+    return key_event_runner(plan, events, backend, play, telemetry)
+
+
+def type_plan(plan, mixer, backend, selector, telemetry=None, start_time=None, events=None):
+    """
+    Types a compiled keystroke plan: every key goes down at its offset and
+    up after its hold, from `start_time` (now by default), each with its
+    own sound from `mixer` (a key-up sound only if the bank has one). Downs
+    and ups are separate events on one timeline, so keys can overlap.
+    `events` runs a subset of the plan's events instead of all of them.
+    Telemetry and the returned lateness summary count events, not keys.
+    """
+    if events is None:
+        events = plan_events(plan)
+    key_event = plan_event_runner(plan, events, mixer, backend, selector, telemetry)
+    scheduler = DeadlineScheduler(events['offset'])
+    return scheduler.run(key_event, start_time=start_time, telemetry=telemetry)
+
+def simulate_typing(text, bank=None, model=None, backend=None, telemetry=None, countdown=5,
+                    augment=True):
     """
     Simulates typing by playing keystroke sounds and injecting characters
-    into the active window.
+    into the active window. `model` is an optional fitted TimingModel,
+    `backend` the injection backend (pynput by default) and `telemetry` an
+    optional Telemetry that times every stage of every keystroke. With
+    `augment`, every press plays a slightly varied take (see augment.py).
     """
+    # Load every sound once up front, in the output device's format, so
+    # nothing touches the disk or converts while typing
+    if bank is None:
+        bank = load_bank(SOUNDS_DIR, default_output_format())
+
     print(f"--- Simulating Typing ---")
     print("Click on the window where you want the text to be typed.")
-    for i in range(5, 0, -1):
+    for i in range(countdown, 0, -1):
         print(f"Starting in {i}...", end='\r', flush=True)
         time.sleep(1)
     
     print("Starting simulation...      ") # Extra spaces to clear line
 
-    for char in text:
-        #Play Sound (in background)
-        # We find the sound for the lowercase version of the key.
-        char_lower = char.lower()
-        if 'a' <= char_lower <= 'z':
-            sound_file = os.path.join(SOUNDS_DIR, f"{char_lower}.wav")
-            # Start the sound playback in a non-blocking background thread
-            sound_thread = threading.Thread(target=play_wav_task, args=(sound_file,), daemon=True)
-            sound_thread.start()
-
-        # Inject Keystroke
-        # The controller handles uppercase, punctuation, etc., automatically.
-        keyboard.type(char)
-
-        # realistic pause 
-        # Add a human-like, slightly random delay between keystrokes.
-        if char == ' ':
-            # Longer pause for spacebar
-            delay = random.uniform(0.12, 0.25)
-        else:
-            # Shorter pause for regular keys
-            delay = random.uniform(0.04, 0.15)
-        
-        time.sleep(delay)
+    if backend is None:
+        backend = PynputBackend()
+
+    # One output stream for the whole session; keystrokes only queue sounds on the mixer
+    mixer = Mixer(bank.channels or 1, bank.sample_width or 2, telemetry=telemetry)
+
+    # realistic pause 
+    # The text is compiled once into keystrokes with a human-like, slightly
+    # random start time and hold each, and the scheduler presses and
+    # releases every key at its absolute time, so delays never drift.
+    plan = compile_plan(text, model=model)
+
+    # Vary each key's sound so repeated letters don't sound identical. The
+    # augmented takes for every key in the text are built now, not mid-sentence.
+    if augment:
+        selector = AugmentedSelector(bank)
+        keys = [KEY_NAMES[sound_id] for sound_id in np.unique(plan['sound_id'])]
+        selector.warm(keys + [release_sound(key) for key in keys])
+    else:
+        selector = VariantSelector(bank)
+
+    with AudioOutput(mixer, bank.rate or 44100) as output:
+        summary = type_plan(plan, mixer, backend, selector, telemetry)
+
+        # Let the last sounds finish before releasing the audio device
+        output.wait_until_idle()
+
+    print(f"Timing: {format_summary(summary)}")
+    if telemetry is not None:
+        print(format_telemetry(telemetry.summary()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Type text into the active window with keystroke sounds.")
+    parser.add_argument("text", nargs="?", default=DEFAULT_TEXT, help="Text to type")
+    parser.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank directory or packed bank file")
+    parser.add_argument("--backend", default="pynput", help="Injection backend: quartz, pynput, recording or null")
+    parser.add_argument("--timing-model", default=TIMING_MODEL_FILE,
+                        help="Timing model fitted by timing_model.py, used if it exists")
+    parser.add_argument("--countdown", type=int, default=5, help="Seconds to switch to the target window")
+    parser.add_argument("--no-augment", action="store_true", help="Play the recorded takes unaltered")
+    parser.add_argument("--telemetry", metavar="PATH", default=None,
+                        help="Time every stage of every keystroke and save them to PATH (.json or .csv)")
+    args = parser.parse_args()
 
-if __name__ == "__main__":
     # Check if the sounds directory exists
-    if not os.path.exists(SOUNDS_DIR) or not os.listdir(SOUNDS_DIR):
-        print(f"Error: The '{SOUNDS_DIR}' directory is missing or empty.")
+    if not os.path.exists(args.sounds_dir) or (os.path.isdir(args.sounds_dir) and not os.listdir(args.sounds_dir)):
+        print(f"Error: The '{args.sounds_dir}' directory is missing or empty.")
         print("Please run the 'record_keys.py' script first to generate the sounds.")
-    else:
-        sentence_to_type = "Hello world! This is a real typing simulation on macOS. Hope this works."
-        try:
-            simulate_typing(sentence_to_type)
-            print("\nSimulation complete.")
-        except Exception as e:
-            print(f"\nAn error occurred. Did you grant Accessibility permissions? Error: {e}")
+        return
+
+    model = None
+    if os.path.exists(args.timing_model):
+        model = TimingModel.load(args.timing_model)
+        print(f"Using typing rhythm from {args.timing_model}")
+    telemetry = Telemetry() if args.telemetry else None
+    try:
+        bank = load_bank(args.sounds_dir, default_output_format())
+        simulate_typing(args.text, bank, model=model, backend=get_backend(args.backend),
+                        telemetry=telemetry, countdown=args.countdown, augment=not args.no_augment)
+        if telemetry is not None:
+            telemetry.save(args.telemetry)
+            print(f"Telemetry saved to {args.telemetry}")
+        print("\nSimulation complete.")
+    except Exception as e:
+        print(f"\nAn error occurred. Did you grant Accessibility permissions? Error: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import hashlib
+import io
+import os
+import random
+import wave
+from urllib.parse import unquote
+
+import numpy as np
+
+SOUNDS_DIR = "keystroke_sounds" # Must match the output dir from the recorder
+CACHE_DIR_NAME = ".cache" # Converted sounds, inside the sounds directory
+RELEASE_SUFFIX = ".up" # Key-up sounds are saved as `<key>.up.wav`, `<key>.up.<n>.wav`
+
+# Characters in key names that can't appear in a file name on every
+# platform, written as %XX escapes; so are control characters
+UNSAFE_FILENAME_CHARS = '/\\:%'
+
+# NumPy sample types for the WAV sample widths we accept
+SAMPLE_DTYPES = {2: np.int16, 4: np.int32}
+
+
+def pcm_to_float(frames, sample_width, channels):
+    """
+    Converts raw PCM frames to a float32 array of shape (n_frames, channels)
+    with samples scaled to [-1.0, 1.0].
+    """
+    dtype = SAMPLE_DTYPES.get(sample_width)
+    if dtype is None:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+    samples /= float(np.iinfo(dtype).max)
+    return samples.reshape(-1, channels)
+
+
+def float_to_pcm(samples, sample_width=2):
+    """Clips float samples to [-1.0, 1.0] and converts them back to PCM bytes."""
+    dtype = SAMPLE_DTYPES[sample_width]
+    scale = float(np.iinfo(dtype).max)
+    return np.rint(np.clip(samples, -1.0, 1.0) * scale).astype(dtype).tobytes()
+
+
+def convert_channels(samples, channels):
+    """Down-mixes or up-mixes (n_frames, c) samples to `channels` channels."""
+    if samples.shape[1] == channels:
+        return samples
+    mono = samples.mean(axis=1, keepdims=True)
+    return np.repeat(mono, channels, axis=1)
+
+
+def resample(samples, rate, target_rate):
+    """
+    Band-limited resampling of (n_frames, channels) samples with one real
+    FFT over all channels at once.
+    """
+    if rate == target_rate or not len(samples):
+        return samples
+    length = len(samples)
+    target_length = max(1, int(round(length * target_rate / rate)))
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = target_length // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.pad(spectrum, ((0, bins - len(spectrum)), (0, 0)))
+    resampled = np.fft.irfft(spectrum, n=target_length, axis=0) * (target_length / length)
+    return resampled.astype(np.float32)
+
+
+def release_sound(key):
+    """Name under which the bank holds the key-up sound of `key`."""
+    return key + RELEASE_SUFFIX
+
+
+def sound_filename(key, variant=0):
+    """
+    File name for a take of `key`: `<key>.wav` for the first, `<key>.<n>.wav`
+    after that. Characters that aren't safe in a file name are %-escaped,
+    as is a leading '.', which would hide the file.
+    """
+    key = ''.join(f"%{ord(c):02X}" if c in UNSAFE_FILENAME_CHARS or ord(c) < 32 else c for c in key)
+    if key.startswith('.'):
+        key = "%2E" + key[1:]
+    if variant == 0:
+        return f"{key}.wav"
+    return f"{key}.{variant}.wav"
+
+
+def parse_sound_filename(filename):
+    """Splits a bank file name into (key, variant), or returns None if it is not a WAV."""
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() != ".wav":
+        return None
+    base, _, suffix = stem.rpartition('.')
+    if base and suffix.isdigit():
+        return unquote(base), int(suffix)
+    return unquote(stem), 0
+
+
+class SoundBank:
+    """
+    Keystroke sounds loaded once at startup and kept in memory.
+
+    Every `<key>.wav` in the sounds directory is read a single time into a
+    contiguous buffer of raw PCM frames, so looking up a sound while typing
+    is a dictionary access with no disk I/O or header parsing. A float32
+    copy of each sound is kept alongside it for mixing.
+
+    Extra takes of a key (`<key>.<n>.wav`) are loaded into `variants`, the
+    list of every take's samples for that key. `sounds` and `samples` hold
+    the first take. Key-up sounds are keys of their own, named by
+    `release_sound`.
+
+    Every sound is converted once to `target_format` (sample width,
+    channels, rate), normally the output device's, or else to the format of
+    the first file. Converted sounds are cached in `cache_dir` by source
+    file hash and target format, so later startups skip the conversion.
+    """
+
+    def __init__(self, sounds_dir=SOUNDS_DIR, target_format=None, cache_dir=None):
+        self.sounds_dir = sounds_dir
+        self.cache_dir = cache_dir if cache_dir is not None else os.path.join(sounds_dir, CACHE_DIR_NAME)
+        self.sample_width = None
+        self.channels = None
+        self.rate = None
+        if target_format is not None:
+            self.sample_width, self.channels, self.rate = target_format
+        self.sounds = {}
+        self.samples = {}
+        self.variants = {}
+        self._load()
+
+    def _load(self):
+        """Reads every WAV in the sounds directory into memory."""
+        if not os.path.isdir(self.sounds_dir):
+            print(f"Warning: Sound directory '{self.sounds_dir}' not found. Bank is empty.")
+            return
+
+        # Load takes in (key, variant) order so each key's list is in take order
+        takes = sorted((parsed, filename) for filename in os.listdir(self.sounds_dir)
+                       if (parsed := parse_sound_filename(filename)))
+        for (key, variant), filename in takes:
+            filepath = os.path.join(self.sounds_dir, filename)
+            samples = self._load_sound(filepath)
+            if samples is None:
+                continue
+            self.variants.setdefault(key, []).append(samples)
+            if key not in self.sounds:
+                self.sounds[key] = float_to_pcm(samples, self.sample_width)
+                self.samples[key] = samples
+
+    def _cache_path(self, data):
+        """Cache file for a source file's contents converted to the bank's format."""
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir,
+                            f"{digest}_{self.sample_width * 8}bit_{self.channels}ch_{self.rate}.npy")
+
+    def _load_sound(self, filepath):
+        """Reads one WAV as float32 samples in the bank's format, converting it if needed."""
+        try:
+            with open(filepath, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Warning: Could not read {filepath}, skipping. Error: {e}")
+            return None
+
+        # Sounds converted on an earlier run come straight from the cache
+        cache_path = None
+        if self.rate is not None:
+            cache_path = self._cache_path(data)
+            if os.path.exists(cache_path):
+                return np.load(cache_path)
+
+        try:
+            with wave.open(io.BytesIO(data), 'rb') as wf:
+                width, channels, rate = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+                frames = wf.readframes(wf.getnframes())
+            samples = pcm_to_float(frames, width, channels)
+        except (wave.Error, EOFError, ValueError) as e:
+            print(f"Warning: Could not decode {filepath}, skipping. Error: {e}")
+            return None
+
+        # Without a target format, all sounds take the format of the first one
+        if self.rate is None:
+            self.sample_width, self.channels, self.rate = width, channels, rate
+            return samples
+        if (channels, rate) == (self.channels, self.rate):
+            return samples
+
+        samples = resample(convert_channels(samples, self.channels), rate, self.rate)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(cache_path, samples)
+        except OSError as e:
+            print(f"Warning: Could not cache converted {filepath}. Error: {e}")
+        return samples
+
+    @property
+    def format(self):
+        """The (sample width, channels, rate) shared by every sound in the bank."""
+        return (self.sample_width, self.channels, self.rate)
+
+    def get(self, key):
+        """Returns the PCM frames for `key`, or None if there is no sound for it."""
+        return self.sounds.get(key)
+
+    def get_samples(self, key):
+        """Returns the float32 samples for `key`, or None if there is no sound for it."""
+        return self.samples.get(key)
+
+    def __contains__(self, key):
+        return key in self.sounds
+
+    def __len__(self):
+        return len(self.sounds)
+
+
+class VariantSelector:
+    """
+    Picks which take of a key to play on each press.
+
+    Each key cycles through all of its takes in a shuffled order, reshuffled
+    in place after every full cycle, so no take repeats back to back and a
+    pick is O(1) with no allocation.
+    """
+
+    def __init__(self, bank, seed=None):
+        self._rng = random.Random(seed)
+        self._variants = bank.variants
+        self._orders = {}
+        self._positions = {}
+        for key, takes in bank.variants.items():
+            order = list(range(len(takes)))
+            self._rng.shuffle(order)
+            self._orders[key] = order
+            self._positions[key] = 0
+
+    def next(self, key):
+        """Returns the samples of the next take of `key`, or None if there is no sound for it."""
+        takes = self._variants.get(key)
+        if takes is None:
+            return None
+        if len(takes) == 1:
+            return takes[0]
+
+        order = self._orders[key]
+        position = self._positions[key]
+        if position == len(order):
+            last = order[-1]
+            self._rng.shuffle(order)
+            # Don't let the new cycle start with the take that just played
+            if order[0] == last:
+                order[0], order[-1] = order[-1], order[0]
+            position = 0
+        self._positions[key] = position + 1
+        return takes[order[position]]
+
+
+def load_bank(path=SOUNDS_DIR, target_format=None):
+    """
+    Opens a packed bank file, or loads a directory of WAVs into a SoundBank
+    converted to `target_format` (sample width, channels, rate).
+    """
+    if os.path.isfile(path):
+        from packed_bank import PackedBank
+        bank = PackedBank(path)
+        if target_format is not None and (bank.channels, bank.rate) != tuple(target_format[1:]):
+            print(f"Warning: Packed bank {path} is {bank.channels}ch at {bank.rate}Hz, "
+                  f"not the requested {target_format[1]}ch at {target_format[2]}Hz.")
+        return bank
+    return SoundBank(path, target_format)
@@ -0,0 +1,126 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from backends import PynputBackend
+from keystroke_plan import plan_events, read_chunks, stream_plans
+from mixer import AudioOutput, Mixer, default_output_format
+from simulate_typing import TIMING_MODEL_FILE, type_plan
+from sound_bank import SOUNDS_DIR, VariantSelector, load_bank
+from timing_model import TimingModel
+
+# --- Streaming Configuration ---
+LOOKAHEAD_CHUNKS = 2  # Chunks read ahead of the one being typed
+
+
+def _read_ahead(chunks, plans, model):
+    """Compiles plans on a background thread into the bounded `plans` queue."""
+    try:
+        for plan in stream_plans(chunks, model):
+            plans.put(plan)
+    finally:
+        plans.put(None)
+
+
+def simulate_typing_stream(source, bank=None, model=None, backend=None, countdown=5):
+    """
+    Types text from `source` (see `read_chunks`) as it arrives. Reading and
+    compiling run a few chunks ahead on a background thread, so memory
+    stays bounded by CHUNK_CHARS * LOOKAHEAD_CHUNKS however long the input is.
+    """
+    if bank is None:
+        bank = load_bank(SOUNDS_DIR, default_output_format())
+    if backend is None:
+        backend = PynputBackend()
+
+    print("--- Streaming Typing ---")
+    print("Click on the window where you want the text to be typed.")
+    for i in range(countdown, 0, -1):
+        print(f"Starting in {i}...", end='\r', flush=True)
+        time.sleep(1)
+    print("Starting simulation...      ")
+
+    plans = queue.Queue(maxsize=LOOKAHEAD_CHUNKS)
+    reader = threading.Thread(target=_read_ahead, args=(read_chunks(source), plans, model), daemon=True)
+    reader.start()
+
+    selector = VariantSelector(bank)
+    mixer = Mixer(bank.channels or 1, bank.sample_width or 2)
+    typed, worst = 0, 0.0
+    start_time = None
+    # Keys pressed in earlier chunks whose key ups come after the last key down so far
+    pending = None
+
+    def release_pending():
+        nonlocal pending, worst
+        # Release held keys on time before waiting for more input, so none auto-repeat
+        events = plan_events(pending)
+        summary = type_plan(pending, mixer, backend, selector, start_time=start_time,
+                            events=events[~events['down']])
+        worst = max(worst, summary['max_ms'])
+        pending = None
+
+    with AudioOutput(mixer, bank.rate or 44100) as output:
+        while True:
+            try:
+                plan = plans.get_nowait()
+            except queue.Empty:
+                if pending is not None:
+                    release_pending()
+                plan = plans.get()
+            if plan is None:
+                if pending is not None:
+                    release_pending()
+                break
+
+            # Put the held keys in front of the chunk so the next key downs can
+            # roll over them, and repeats and chords across the boundary are
+            # released in time; only their key ups are left to run
+            held = 0 if pending is None else len(pending)
+            if held:
+                plan = np.concatenate([pending, plan])
+            events = plan_events(plan)
+            events = events[~events['down'] | (events['index'] >= held)]
+            later = events['offset'] > plan['offset'][-1]
+            pending = plan[np.unique(events['index'][later])] if later.any() else None
+
+            now = time.perf_counter()
+            first_press = plan['offset'][held]
+            if start_time is None:
+                start_time = now - first_press
+            elif start_time + first_press < now:
+                # The input fell behind; start this chunk now instead of rushing to catch up
+                start_time = now - first_press
+
+            summary = type_plan(plan, mixer, backend, selector, start_time=start_time, events=events[~later])
+            typed += len(plan) - held
+            worst = max(worst, summary['max_ms'])
+        output.wait_until_idle()
+
+    print(f"Typed {typed} keys, worst lateness {worst:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Type text from a file or stdin as it arrives.")
+    parser.add_argument("file", nargs="?", default=None, help="Text file to type (default: stdin)")
+    parser.add_argument("--sounds-dir", default=SOUNDS_DIR, help="Sound bank directory or packed bank file")
+    args = parser.parse_args()
+
+    model = None
+    if os.path.exists(TIMING_MODEL_FILE):
+        model = TimingModel.load(TIMING_MODEL_FILE)
+    source = args.file if args.file else sys.stdin
+    try:
+        simulate_typing_stream(source, load_bank(args.sounds_dir, default_output_format()), model=model)
+        print("\nSimulation complete.")
+    except Exception as e:
+        print(f"\nAn error occurred. Did you grant Accessibility permissions? Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import csv
+import json
+
+import numpy as np
+
+# --- Telemetry Configuration ---
+# Stages timed for every keystroke, in perf_counter seconds
+STAGES = (
+    'deadline',    # When the scheduler meant to start the key
+    'scheduled',   # When the scheduler actually started it
+    'injected',    # When the key event had been posted
+    'enqueued',    # When its sound had been handed to the mixer
+    'audio_start', # When the sound's first sample reaches the device, as reported by the stream
+)
+DEADLINE, SCHEDULED, INJECTED, ENQUEUED, AUDIO_START = range(len(STAGES))
+CAPACITY = 4096 # Most recent keystrokes kept
+
+
+class Telemetry:
+    """
+    Per-keystroke stage timestamps in a preallocated ring buffer.
+
+    Hot paths take an optional `telemetry` and only call `mark()` when it is
+    not None, so timing costs one comparison per stage when it is off.
+    Marking never allocates; only the last CAPACITY keystrokes are kept.
+    """
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._times = np.full((capacity, len(STAGES)), np.nan)
+        self._events = np.full(capacity, -1, dtype=np.int64)
+
+    def mark(self, event, stage, t):
+        """Records time `t` for `stage` of keystroke number `event`."""
+        row = event % self.capacity
+        if self._events[row] != event:
+            self._events[row] = event
+            self._times[row] = np.nan
+        self._times[row, stage] = t
+
+    def records(self):
+        """Stage times of the kept keystrokes as (event numbers, times), oldest first."""
+        order = np.argsort(self._events)
+        order = order[self._events[order] >= 0]
+        return self._events[order], self._times[order]
+
+    def metrics(self):
+        """Per-keystroke intervals in seconds, named by what they measure."""
+        _, times = self.records()
+        return {
+            'scheduler_lateness': times[:, SCHEDULED] - times[:, DEADLINE],
+            'inject_latency': times[:, INJECTED] - times[:, SCHEDULED],
+            'enqueue_latency': times[:, ENQUEUED] - times[:, SCHEDULED],
+            'audio_key_skew': times[:, AUDIO_START] - times[:, INJECTED],
+        }
+
+    def summary(self):
+        """Count, p50, p95 and p99 (in milliseconds) of every metric."""
+        summary = {}
+        for name, values in self.metrics().items():
+            values = values[~np.isnan(values)] * 1000.0
+            if not len(values):
+                summary[name] = {'count': 0}
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {'count': len(values), 'p50_ms': float(p50),
+                             'p95_ms': float(p95), 'p99_ms': float(p99)}
+        return summary
+
+    def to_csv(self, filepath):
+        """Writes one row of stage times per keystroke."""
+        events, times = self.records()
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('event',) + STAGES)
+            for event, row in zip(events.tolist(), times.tolist()):
+                writer.writerow([event] + ['' if np.isnan(t) else f"{t:.9f}" for t in row])
+
+    def to_json(self, filepath):
+        """Writes the summary and the raw stage times as JSON."""
+        events, times = self.records()
+        data = {
+            'summary': self.summary(),
+            'stages': STAGES,
+            'events': events.tolist(),
+            'times': [[None if np.isnan(t) else t for t in row] for row in times.tolist()],
+        }
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def save(self, filepath):
+        """Writes the stage times as CSV if `filepath` ends in .csv, else the summary and times as JSON."""
+        if filepath.lower().endswith('.csv'):
+            self.to_csv(filepath)
+        else:
+            self.to_json(filepath)
+
+
+def format_telemetry(summary):
+    """Human-readable lines for a telemetry summary."""
+    lines = []
+    for name, stats in summary.items():
+        if not stats['count']:
+            continue
+        lines.append(f"{name}: p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms, "
+                     f"p99 {stats['p99_ms']:.3f} ms ({stats['count']} keys)")
+    return '\n'.join(lines)
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from async_typing import TypingSession
+from backends import RecordingBackend
+from bench import write_synthetic_bank
+from mixer import Mixer
+from sound_bank import load_bank
+
+
+@pytest.fixture
+def bank(tmp_path):
+    write_synthetic_bank(str(tmp_path))
+    return load_bank(str(tmp_path))
+
+
+def held_keys(backend):
+    held = []
+    for _, event, key in backend.events:
+        if event == 'press':
+            held.append(key)
+        else:
+            held.remove(key)
+    return held
+
+
+@pytest.mark.parametrize("cancel_after", [0.0, 0.03, 0.2])
+def test_cancel_releases_held_keys(bank, cancel_after):
+    backend = RecordingBackend()
+    mixer = Mixer(bank.channels, bank.sample_width)
+
+    async def cancel_mid_text():
+        task = asyncio.create_task(TypingSession("Hello World", bank, mixer, backend, seed=1).run())
+        await asyncio.sleep(cancel_after)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_mid_text())
+    assert backend.events
+    assert held_keys(backend) == []
@@ -0,0 +1,107 @@
+import os
+import socket
+import threading
+
+import pytest
+
+from bench import write_synthetic_bank
+from daemon import DaemonServer, TypingDaemon, send_request
+
+
+@pytest.fixture
+def bank_dir(tmp_path):
+    directory = tmp_path / "sounds"
+    directory.mkdir()
+    write_synthetic_bank(str(directory))
+    return str(directory)
+
+
+@pytest.fixture
+def typing_daemon(bank_dir):
+    daemon = TypingDaemon(bank_dir, backend_name='recording', null_audio=True)
+    yield daemon
+    daemon.stop()
+
+
+@pytest.fixture
+def socket_path(typing_daemon, tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    server = DaemonServer(typing_daemon, path)
+    typing_daemon.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def pressed_keys(backend):
+    return [key for _, event, key in backend.events if event == 'press']
+
+
+def test_type_job_runs_on_null_audio(typing_daemon):
+    typing_daemon.start()
+    job = typing_daemon.submit({'command': 'type', 'text': "ab c", 'seed': 1})
+    assert job.done.wait(10)
+    assert job.result['ok'], job.result
+    assert job.result['lateness']['count'] == 8 # A key down and a key up per keystroke
+    assert pressed_keys(typing_daemon.backend) == ['a', 'b', ' ', 'c']
+
+
+def test_higher_priority_runs_first(typing_daemon):
+    # Queued before the worker starts, so the queue alone decides the order
+    jobs = [typing_daemon.submit({'command': 'type', 'text': text, 'priority': priority, 'seed': 1})
+            for text, priority in (("a", 0), ("b", 5), ("c", 0), ("d", 5))]
+    typing_daemon.start()
+    for job in jobs:
+        assert job.done.wait(10)
+    assert pressed_keys(typing_daemon.backend) == ['b', 'd', 'a', 'c']
+
+
+def test_render_job_writes_wav(typing_daemon, tmp_path):
+    typing_daemon.start()
+    output = str(tmp_path / "out.wav")
+    job = typing_daemon.submit({'command': 'render', 'text': "Hi!", 'output': output, 'seed': 1})
+    assert job.done.wait(10)
+    assert job.result['ok'], job.result
+    assert os.path.getsize(output) > 44
+
+
+def test_failed_job_reports_error(typing_daemon, tmp_path):
+    typing_daemon.start()
+    job = typing_daemon.submit({'command': 'render', 'text': "a", 'output': str(tmp_path / "out.txt")})
+    assert job.done.wait(10)
+    assert not job.result['ok']
+    assert ".wav" in job.result['error']
+
+
+def test_wait_returns_result(socket_path):
+    ack, result = send_request({'command': 'type', 'text': "a", 'seed': 1, 'wait': True}, socket_path)
+    assert ack['ok'] and result['ok']
+    assert result['job'] == ack['job']
+
+
+def test_status(socket_path):
+    status, = send_request({'command': 'status'}, socket_path)
+    assert status['ok'] and status['queued'] == 0 and status['running'] is None
+
+
+@pytest.mark.parametrize("request_text", ["[]", '"x"', "1", "null", "not json", '{"command": "nope"}'])
+def test_bad_requests_get_error_replies(socket_path, request_text):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(request_text.encode('utf-8') + b"\n" + b'{"command": "status"}\n')
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('rb') as f:
+            replies = f.read().splitlines()
+    # The bad request is answered with an error and the connection keeps serving
+    assert len(replies) == 2
+    assert b'"ok": false' in replies[0]
+    assert b'"ok": true' in replies[1]
+
+
+def test_refuses_live_socket(typing_daemon, socket_path):
+    with pytest.raises(FileExistsError):
+        DaemonServer(typing_daemon, socket_path)
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
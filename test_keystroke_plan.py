@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from keymap import KEY_CODES
+from keystroke_plan import REPEAT_GAP, compile_plan, plan_events
+
+
+def replay(plan, events):
+    """Key codes held down after each event, failing on a release of a key that isn't down."""
+    held = []
+    states = []
+    for index, down in zip(events['index'].tolist(), events['down'].tolist()):
+        key_code = int(plan['key_code'][index])
+        if down:
+            held.append(key_code)
+        else:
+            assert key_code in held, f"key {key_code} released before it was pressed"
+            held.remove(key_code)
+        states.append(list(held))
+    return states
+
+
+def test_every_key_goes_down_and_up_once():
+    plan = compile_plan("Hello, World!", seed=1)
+    events = plan_events(plan)
+    assert len(events) == 2 * len(plan)
+    assert np.all(np.diff(events['offset']) >= 0)
+    for i in range(len(plan)):
+        down, up = events[events['index'] == i]
+        assert down['down'] and not up['down']
+        assert down['offset'] <= up['offset']
+    assert replay(plan, events)[-1] == []
+
+
+@pytest.mark.parametrize("interval", [0.0, REPEAT_GAP / 2, REPEAT_GAP])
+@pytest.mark.parametrize("text", ["aab", "Ab", "AAb", "a!a", "xxxx"])
+def test_own_release_never_precedes_press(text, interval):
+    plan = compile_plan(text, seed=1, interval=interval)
+    events = plan_events(plan)
+    states = replay(plan, events)
+    assert states[-1] == []
+
+
+def test_repeated_key_released_before_next_press():
+    plan = compile_plan("aa", seed=1, interval=0.05)
+    plan['hold'] = 0.2
+    events = plan_events(plan)
+    assert events['index'].tolist() == [0, 0, 1, 1]
+    assert events['down'].tolist() == [True, False, True, False]
+    assert events['offset'][1] == pytest.approx(0.05 - REPEAT_GAP)
+
+
+def test_chord_released_before_next_key():
+    plan = compile_plan("Ab", seed=1, interval=0.05)
+    plan['hold'] = 0.2
+    events = plan_events(plan)
+    states = replay(plan, events)
+    # Shift+A is up before b goes down, so b is typed without Shift
+    b_down = events['down'].tolist().index(True, 1)
+    assert states[b_down] == [KEY_CODES['b']]
+
+
+def test_plain_keys_roll_over():
+    plan = compile_plan("ab", seed=1, interval=0.05)
+    plan['hold'] = 0.2
+    events = plan_events(plan)
+    assert events['down'].tolist() == [True, True, False, False]
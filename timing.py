@@ -0,0 +1,44 @@
+import numpy as np
+
+# --- Typing Rhythm ---
+# Human-like pause after each keystroke, in seconds (min, max)
+KEY_DELAY = (0.04, 0.15)
+SPACE_DELAY = (0.12, 0.25) # Longer pause for spacebar
+HOLD_TIME = (0.06, 0.12) # How long each key is held down, in seconds (min, max)
+
+
+def build_timeline(text, seed=None, model=None):
+    """
+    Computes the onset time (in seconds from the first key) of every
+    character in `text` in one vectorized pass.
+
+    Both the live simulator and the offline renderer use this, so a rendered
+    session has the rhythm of a live one. With a fitted `TimingModel`, delays
+    come from recorded typing instead of the fixed ranges above.
+    """
+    if model is not None:
+        return model.build_timeline(text, seed=seed)
+
+    rng = np.random.default_rng(seed)
+    chars = np.array(list(text), dtype=object)
+    is_space = chars == ' '
+    low = np.where(is_space, SPACE_DELAY[0], KEY_DELAY[0])
+    high = np.where(is_space, SPACE_DELAY[1], KEY_DELAY[1])
+    delays = rng.uniform(low, high)
+
+    # Each key starts after the pauses of all keys before it
+    onsets = np.zeros(len(text))
+    onsets[1:] = np.cumsum(delays[:-1])
+    return onsets
+
+
+def build_holds(text, seed=None, model=None):
+    """
+    How long each character's key is held down, in seconds. For the same
+    seed these are drawn independently of the onsets of `build_timeline`.
+    """
+    seed = None if seed is None else (seed, 1)
+    if model is not None:
+        return model.hold_durations(text, seed=seed)
+    rng = np.random.default_rng(seed)
+    return rng.uniform(HOLD_TIME[0], HOLD_TIME[1], len(text))
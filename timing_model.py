@@ -0,0 +1,169 @@
+import argparse
+import csv
+
+import numpy as np
+
+from keymap import char_to_key
+
+# --- Model Configuration ---
+QUANTILES = 32      # Points kept from each fitted delay distribution
+MIN_SAMPLES = 5     # Fewer observations than this fall back to coarser stats
+MAX_INTERVAL = 2.0  # Longer gaps between presses are pauses, not typing rhythm
+MAX_HOLD = 1.0      # Longer holds are deliberate, not typing
+ASCII_SIZE = 128    # Character codes with their own table row; others share one
+
+# Key names in the recorder logs that stand for a character other than themselves
+KEY_CHARS = {'return': '\n', 'enter': '\n', 'tab': '\t', 'space': ' '}
+
+
+def read_key_log(filepath):
+    """
+    Reads a press/release log written by `record_keys_old.py`.
+    Returns a list of (key name, event, time in seconds) sorted by time.
+    """
+    events = []
+    with open(filepath, newline='') as f:
+        for row in csv.DictReader(f):
+            events.append((row["key"], row["event"], int(row["time_ns"]) / 1e9))
+    events.sort(key=lambda event: event[2])
+    return events
+
+
+def _quantiles(values):
+    """The fitted distribution of `values`: QUANTILES evenly spaced quantiles."""
+    points = (np.arange(QUANTILES) + 0.5) / QUANTILES
+    return np.quantile(np.asarray(values, dtype=np.float64), points).astype(np.float32)
+
+
+class TimingModel:
+    """
+    Inter-key latency and hold-time distributions learned from recorded
+    typing sessions.
+
+    Each distribution is compiled into a row of quantiles: `latency[prev,
+    cur]` for every digraph and `hold[key]` for every key. Digraphs with
+    too little data get the current key's distribution, and keys with too
+    little data get the global one. Drawing a delay is then a single array
+    index with a random quantile number, and a whole text is sampled with
+    one vectorized lookup.
+    """
+
+    def __init__(self, latency, hold, char_ids):
+        self.latency = latency    # (n_keys, n_keys, QUANTILES) seconds
+        self.hold = hold          # (n_keys, QUANTILES) seconds
+        self.char_ids = char_ids  # Character code -> key id; the last entry is for non-ASCII
+
+    @classmethod
+    def fit(cls, sessions):
+        """Fits a model from one or more event lists as returned by `read_key_log`."""
+        key_names = sorted({key for events in sessions for key, _, _ in events})
+        ids = {key: i for i, key in enumerate(key_names)}
+        other = len(key_names) # Bucket for characters never seen in the logs
+        n_keys = other + 1
+
+        intervals, holds = [], []
+        for events in sessions:
+            previous = None
+            held = {}
+            for key, event, t in events:
+                if event == 'press':
+                    if previous is not None and 0 < t - previous[1] <= MAX_INTERVAL:
+                        intervals.append((ids[previous[0]], ids[key], t - previous[1]))
+                    previous = (key, t)
+                    held[key] = t
+                elif key in held:
+                    duration = t - held.pop(key)
+                    if 0 < duration <= MAX_HOLD:
+                        holds.append((ids[key], duration))
+        if not intervals or not holds:
+            raise ValueError("Not enough press/release events to fit a timing model")
+
+        intervals = np.array(intervals)
+        holds = np.array(holds)
+
+        # Global, then per-key, then per-digraph, each level overriding the last where it has data
+        latency = np.empty((n_keys, n_keys, QUANTILES), dtype=np.float32)
+        latency[:] = _quantiles(intervals[:, 2])
+        cur_ids = intervals[:, 1].astype(int)
+        for cur in np.unique(cur_ids):
+            values = intervals[cur_ids == cur, 2]
+            if len(values) >= MIN_SAMPLES:
+                latency[:, cur] = _quantiles(values)
+        digraphs = intervals[:, 0].astype(int) * n_keys + cur_ids
+        for digraph in np.unique(digraphs):
+            values = intervals[digraphs == digraph, 2]
+            if len(values) >= MIN_SAMPLES:
+                latency[digraph // n_keys, digraph % n_keys] = _quantiles(values)
+
+        hold = np.empty((n_keys, QUANTILES), dtype=np.float32)
+        hold[:] = _quantiles(holds[:, 1])
+        hold_ids = holds[:, 0].astype(int)
+        for key_id in np.unique(hold_ids):
+            values = holds[hold_ids == key_id, 1]
+            if len(values) >= MIN_SAMPLES:
+                hold[key_id] = _quantiles(values)
+
+        # Map every typeable character to the id of the key that types it, so
+        # 'A' and '!' share the ids of 'a' and '1'
+        key_ids = {}
+        for key, key_id in ids.items():
+            char = KEY_CHARS.get(key, key)
+            base = char_to_key(char) if len(char) == 1 else None
+            # A logged shifted character only stands in for its key if the key wasn't logged
+            if base is not None and (base[1] == 0 or base[0] not in key_ids):
+                key_ids[base[0]] = key_id
+        char_ids = np.full(ASCII_SIZE + 1, other, dtype=np.int32)
+        for code in range(ASCII_SIZE):
+            key = char_to_key(chr(code))
+            if key is not None and key[0] in key_ids:
+                char_ids[code] = key_ids[key[0]]
+        return cls(latency, hold, char_ids)
+
+    @classmethod
+    def load(cls, filepath):
+        """Loads a compiled model saved with `save`."""
+        with np.load(filepath) as data:
+            return cls(data["latency"], data["hold"], data["char_ids"])
+
+    def save(self, filepath):
+        """Saves the compiled tables to an .npz file."""
+        np.savez(filepath, latency=self.latency, hold=self.hold, char_ids=self.char_ids)
+
+    def text_ids(self, text):
+        """Key id of every character of `text`."""
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        return self.char_ids[np.minimum(codes, ASCII_SIZE)]
+
+    def sample_delay(self, prev_id, cur_id, rng):
+        """Draws one press-to-press delay for the digraph (prev_id, cur_id)."""
+        return float(self.latency[prev_id, cur_id, rng.integers(QUANTILES)])
+
+    def build_timeline(self, text, seed=None):
+        """Onset time (in seconds from the first key) of every character in `text`."""
+        rng = np.random.default_rng(seed)
+        ids = self.text_ids(text)
+        delays = self.latency[ids[:-1], ids[1:], rng.integers(QUANTILES, size=max(len(ids) - 1, 0))]
+        onsets = np.zeros(len(ids))
+        onsets[1:] = np.cumsum(delays)
+        return onsets
+
+    def hold_durations(self, text, seed=None):
+        """How long each character's key is held down, in seconds."""
+        rng = np.random.default_rng(seed)
+        ids = self.text_ids(text)
+        return self.hold[ids, rng.integers(QUANTILES, size=len(ids))].astype(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a typing timing model from recorded key logs.")
+    parser.add_argument("logs", nargs="+", help="key_log.csv files written by record_keys_old.py")
+    parser.add_argument("-o", "--output", default="timing_model.npz", help="Where to save the model")
+    args = parser.parse_args()
+
+    model = TimingModel.fit([read_key_log(path) for path in args.logs])
+    model.save(args.output)
+    print(f"Fitted timing model for {model.latency.shape[0] - 1} keys, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()